@@ -28,6 +28,23 @@ def cli():
     pass
 
 
+def _post_stores(enabled: bool = True) -> list:
+    """Indexes updated with every saved scrape."""
+    if not enabled:
+        return []
+    from src.engagement_store import EngagementStore
+    from src.geo_index import GeoIndex
+    from src.search_index import SearchIndex
+    
+    stores = []
+    for store_class in (GeoIndex, SearchIndex, EngagementStore):
+        try:
+            stores.append(store_class())
+        except Exception as e:
+            logger.warning(f"{store_class.__name__} disabled: {e}")
+    return stores
+
+
 @cli.command()
 def login():
     try:
@@ -48,14 +65,39 @@ def login():
 @click.option('--output', '-o', default='output', help='Output directory for JSON files')
 @click.option('--pretty', is_flag=True, help='Pretty print output to console')
 @click.option('--no-warmup', is_flag=True, help='Skip warm-up session (not recommended)')
-def scrape(hashtag, recent, top, no_top, output, pretty, no_warmup):
+@click.option('--archive', default=None, help='Also archive raw API responses to this directory')
+@click.option('--enrich-users', is_flag=True, help='Fill author follower/following/media counts and bio (cached per user)')
+@click.option('--no-index', is_flag=True, help='Do not add the scraped posts to the local indexes')
+@click.option('--profile', is_flag=True, help='Profile the run (cProfile + per-phase timings)')
+@click.option('--profile-dir', default='profiles', help='Output directory for profiling reports')
+@click.option('--profile-memory', is_flag=True, help='Also report top allocations with tracemalloc')
+def scrape(hashtag, recent, top, no_top, output, pretty, no_warmup, archive, enrich_users, no_index,
+           profile, profile_dir, profile_memory):
+    recorder = None
+    profiler = None
     try:
         logger.info(f"Starting scrape for hashtag: {hashtag}")
         
+        if profile or profile_memory:
+            from src.profiling import Profiler
+            profiler = Profiler(trace_memory=profile_memory)
+            profiler.start()
+        
+        if archive:
+            from src.recorder import ResponseRecorder
+            recorder = ResponseRecorder(archive)
+        
         # Create client with warm-up control
         from src.instagram_client import InstagramClient
-        client = InstagramClient(warm_up=not no_warmup)
-        scraper = HashtagScraper(client=client)
+        client = InstagramClient(warm_up=not no_warmup, recorder=recorder)
+        scraper = HashtagScraper(client=client, stores=_post_stores(not no_index))
+        
+        if profiler:
+            # Log in up front so it is timed separately from the first request
+            from src.profiling import span
+            with span("login"):
+                client.client
+        
         data = scraper.scrape_hashtag(
             hashtag=hashtag,
             max_recent=recent,
@@ -63,6 +105,12 @@ def scrape(hashtag, recent, top, no_top, output, pretty, no_warmup):
             include_top_posts=not no_top
         )
         
+        if enrich_users:
+            from src.enrichment import UserEnricher
+            enricher = UserEnricher(client)
+            enricher.enrich([data])
+            enricher.cache.close()
+        
         filepath = scraper.save_to_json(data, output)
         
         if pretty:
@@ -84,11 +132,328 @@ def scrape(hashtag, recent, top, no_top, output, pretty, no_warmup):
                         print(f"   Caption: {caption_preview}")
                     print(f"   URL: https://instagram.com/p/{post.shortcode}/")
         
+        from src.retry_policy import retry_policy
+        if retry_policy.errors:
+            logger.info(f"Request errors: {retry_policy.stats()}")
+        
         logger.info(f"✅ Scraping completed! Data saved to: {filepath}")
         
     except Exception as e:
         logger.error(f"❌ Scraping failed: {e}")
         sys.exit(1)
+    finally:
+        if recorder:
+            recorder.close()
+        if profiler:
+            from datetime import datetime
+            profiler.stop()
+            name = f"{hashtag.strip('#')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            profiler.save(profile_dir, name)
+            print("\n" + profiler.phase_table())
+            if profile_memory:
+                print("\n" + profiler.allocation_report())
+
+
+@cli.command()
+@click.argument('archives', nargs=-1, required=True)
+@click.option('--output', '-o', default='output', help='Output directory for JSON files')
+def replay(archives, output):
+    """Re-extract archived raw responses offline, without touching the network."""
+    try:
+        from datetime import datetime
+        from src.recorder import MEDIAS_TOP, ReplayClient, find_archives, load_runs
+        
+        client = ReplayClient(load_runs(find_archives(archives)))
+        scraper = HashtagScraper(client=client, human_delays=False, stores=_post_stores())
+        
+        for run in client.runs:
+            data = scraper.scrape_hashtag(
+                hashtag=run["hashtag"],
+                max_recent=sys.maxsize,
+                max_top=sys.maxsize,
+                include_top_posts=MEDIAS_TOP in run
+            )
+            # Keep the original scrape time so files and engagement history line up
+            data.scraped_at = datetime.fromisoformat(run["recorded_at"])
+            scraper.save_to_json(data, output)
+        
+        logger.info(f"✅ Replayed {len(client.runs)} hashtag runs into: {output}")
+    except Exception as e:
+        logger.error(f"❌ Replay failed: {e}")
+        sys.exit(1)
+
+
+@cli.command()
+@click.argument('keys', nargs=-1)
+@click.option('--file', '-f', 'keys_file', type=click.Path(exists=True), help='File with one post_id or shortcode per line')
+@click.option('--output', '-o', default='output', help='Directory containing scraped JSON files')
+@click.option('--reindex', is_flag=True, help='Build missing indexes for older output files and rebuild the combined lookup index first')
+def lookup(keys, keys_file, output, reindex):
+    """Look up scraped posts by post_id or shortcode."""
+    try:
+        from src.output_index import build_missing_indexes, lookup_raw
+        
+        keys = list(keys)
+        if keys_file:
+            with open(keys_file, 'r') as f:
+                keys.extend(line.strip() for line in f if line.strip())
+        
+        if reindex:
+            indexed = build_missing_indexes(output)
+            logger.info(f"Indexed {indexed} older output files")
+        
+        found = lookup_raw(keys, output)
+        for key in keys:
+            if key in found:
+                print(json.dumps(found[key], ensure_ascii=False))
+        
+        missing = len(set(keys)) - len(found)
+        logger.info(f"✅ Found {len(found)} posts ({missing} not found)")
+    except Exception as e:
+        logger.error(f"❌ Lookup failed: {e}")
+        sys.exit(1)
+
+
+@cli.command()
+@click.argument('archives', nargs=-1, required=True)
+@click.option('--output', '-o', default='output', help='Output directory for the merged JSONL file')
+@click.option('--workers', '-w', type=int, default=None, help='Worker processes (default: CPU count)')
+@click.option('--chunk-size', type=int, default=None, help='Archive files per worker task')
+def reprocess(archives, output, workers, chunk_size):
+    """Re-extract archived raw responses in bulk across a process pool."""
+    try:
+        from src.recorder import find_archives
+        from src.reprocess import reprocess_archives
+        
+        merged = reprocess_archives(find_archives(archives), output, workers, chunk_size)
+        logger.info(f"✅ Reprocessing completed! Data saved to: {merged}")
+    except Exception as e:
+        logger.error(f"❌ Reprocessing failed: {e}")
+        sys.exit(1)
+
+
+@cli.group()
+def schedule():
+    """Manage recurring hashtag jobs run by `serve`."""
+    pass
+
+
+@schedule.command('add')
+@click.option('--hashtag', '-h', required=True, help='Hashtag to scrape (with or without #)')
+@click.option('--interval', '-i', default=3600, type=click.IntRange(min=60), help='Seconds between runs (at least 60)')
+@click.option('--priority', '-p', default=0, help='Higher priority jobs run first when several are due')
+@click.option('--recent', '-r', default=50, help='Number of recent posts to scrape')
+@click.option('--top', '-t', default=9, help='Number of top posts to scrape')
+@click.option('--no-top', is_flag=True, help='Skip scraping top posts')
+@click.option('--adaptive', is_flag=True, help='Resize interval and --recent from measured post velocity')
+def schedule_add(hashtag, interval, priority, recent, top, no_top, adaptive):
+    from src.scheduler import JobQueue
+    queue = JobQueue()
+    try:
+        queue.add_job(hashtag, interval, priority, recent, top, include_top=not no_top, adaptive=adaptive)
+        logger.info(f"✅ Scheduled #{hashtag.strip('#')} every {interval}s")
+    except ValueError as e:
+        logger.error(f"❌ Scheduling failed: {e}")
+        sys.exit(1)
+    finally:
+        queue.close()
+
+
+@schedule.command('remove')
+@click.option('--hashtag', '-h', required=True, help='Hashtag to unschedule')
+def schedule_remove(hashtag):
+    from src.scheduler import JobQueue
+    queue = JobQueue()
+    if queue.remove_job(hashtag):
+        logger.info(f"✅ Removed #{hashtag.strip('#')}")
+    else:
+        logger.warning(f"No job found for #{hashtag.strip('#')}")
+    queue.close()
+
+
+@schedule.command('list')
+def schedule_list():
+    from src.scheduler import JobQueue
+    queue = JobQueue()
+    jobs = queue.list_jobs()
+    queue.close()
+    
+    if not jobs:
+        print("No scheduled jobs")
+        return
+    
+    print(f"{'HASHTAG':<30} {'EVERY':>8} {'RECENT':>6} {'POSTS/H':>8} {'PRIO':>5} {'RUNS':>6}  {'NEXT RUN':<19}  LAST ERROR")
+    for job in jobs:
+        every = f"{job['interval_seconds']}s" + ("*" if job['adaptive'] else "")
+        rate = f"{job['posts_per_hour']:.1f}" if job['posts_per_hour'] is not None else "-"
+        print(f"{job['hashtag']:<30} {every:>8} {job['max_recent']:>6} {rate:>8} {job['priority']:>5} "
+              f"{job['run_count']:>6}  {job['next_run'][:19]:<19}  {job['last_error'] or ''}")
+
+
+@cli.command()
+@click.option('--output', '-o', default='output', help='Output directory for JSON files')
+@click.option('--max-requests', type=int, default=None, help='API request budget per hour (default: MAX_REQUESTS_PER_HOUR)')
+@click.option('--no-warmup', is_flag=True, help='Skip warm-up session (not recommended)')
+@click.option('--enrich-users', is_flag=True, help='Fill author profile fields (cached per user)')
+def serve(output, max_requests, no_warmup, enrich_users):
+    """Run scheduled hashtag jobs continuously with a single logged-in client."""
+    try:
+        from src.scheduler import JobQueue, Scheduler
+        
+        client = InstagramClient(warm_up=not no_warmup)
+        enricher = None
+        if enrich_users:
+            from src.enrichment import UserEnricher
+            enricher = UserEnricher(client)
+        scheduler = Scheduler(
+            JobQueue(),
+            client=client,
+            output_dir=output,
+            max_requests_per_hour=max_requests,
+            enricher=enricher,
+            stores=_post_stores()
+        )
+        scheduler.serve()
+    except Exception as e:
+        logger.error(f"❌ Scheduler failed: {e}")
+        sys.exit(1)
+
+
+@cli.command()
+@click.option('--bbox', default=None, help='Bounding box as min_lat,min_lng,max_lat,max_lng')
+@click.option('--near', default=None, help='Centre point as lat,lng (use with --radius)')
+@click.option('--radius', default=1.0, help='Search radius in km around --near (default: 1)')
+@click.option('--limit', '-l', default=100, help='Maximum number of posts to return')
+@click.option('--rebuild', is_flag=True, help='Index all existing output files first')
+@click.option('--output', '-o', default='output', help='Directory containing scraped JSON files (for --rebuild)')
+def geo(bbox, near, radius, limit, rebuild, output):
+    """Find scraped posts by location."""
+    try:
+        from src.geo_index import GeoIndex
+        
+        index = GeoIndex()
+        if rebuild:
+            from src.output_index import iter_scrapes
+            added = sum(index.add_scrape(data, filepath) for filepath, data in iter_scrapes(output))
+            logger.info(f"Indexed {added} new located posts ({index.count()} total)")
+        
+        if bbox:
+            min_lat, min_lng, max_lat, max_lng = (float(v) for v in bbox.split(','))
+            results = index.bbox(min_lat, min_lng, max_lat, max_lng, limit)
+        elif near:
+            lat, lng = (float(v) for v in near.split(','))
+            results = index.radius(lat, lng, radius, limit)
+        else:
+            results = None
+        index.close()
+        
+        if results is not None:
+            for row in results:
+                print(json.dumps(row, ensure_ascii=False))
+            logger.info(f"✅ Found {len(results)} posts")
+    except Exception as e:
+        logger.error(f"❌ Geo query failed: {e}")
+        sys.exit(1)
+
+
+@cli.command()
+@click.argument('query', required=False)
+@click.option('--since', default=None, help='Only posts taken on/after this ISO date (e.g. 2024-01-01)')
+@click.option('--until', default=None, help='Only posts taken before this ISO date')
+@click.option('--hashtag', '-h', default=None, help='Only posts with this hashtag')
+@click.option('--limit', '-l', default=20, help='Maximum number of results')
+@click.option('--rebuild', is_flag=True, help='Index all existing output files first')
+@click.option('--output', '-o', default='output', help='Directory containing scraped JSON files (for --rebuild)')
+def search(query, since, until, hashtag, limit, rebuild, output):
+    """Full-text search over captions, hashtags and usernames."""
+    try:
+        from src.search_index import SearchIndex
+        
+        index = SearchIndex()
+        if rebuild:
+            from src.output_index import iter_scrapes
+            added = sum(index.add_scrape(data, filepath) for filepath, data in iter_scrapes(output))
+            index.optimize()
+            logger.info(f"Indexed {added} new posts ({index.count()} total)")
+        
+        if query:
+            results = index.search(query, since=since, until=until, hashtag=hashtag, limit=limit)
+            for i, row in enumerate(results, 1):
+                print(f"{i}. @{row['username']}  {row['taken_at'][:10]}  https://instagram.com/p/{row['shortcode']}/")
+                print(f"   {row['snippet']}")
+            logger.info(f"✅ Found {len(results)} posts")
+        index.close()
+    except Exception as e:
+        logger.error(f"❌ Search failed: {e}")
+        sys.exit(1)
+
+
+@cli.command()
+@click.argument('post_ids', nargs=-1)
+@click.option('--window', type=float, default=None, help='Growth rate over the last N hours only')
+@click.option('--top', 'top_n', type=int, default=None, help='List the N posts gaining likes fastest')
+@click.option('--rebuild', is_flag=True, help='Record observations from all existing output files first')
+@click.option('--output', '-o', default='output', help='Directory containing scraped JSON files (for --rebuild)')
+def engagement(post_ids, window, top_n, rebuild, output):
+    """Show engagement curves and growth rates of repeatedly scraped posts."""
+    try:
+        from datetime import datetime
+        from src.engagement_store import EngagementStore
+        
+        store = EngagementStore()
+        if rebuild:
+            from src.output_index import iter_payloads
+            # Raw payloads keep the per-post observation times of compacted segments
+            added = sum(store.add_payload(payload) for _, payload in iter_payloads(output, by_time=True))
+            logger.info(f"Recorded {added} new observations")
+        
+        for post_id in post_ids:
+            series = store.series(post_id)
+            if not series:
+                print(f"{post_id}: no observations")
+                continue
+            print(f"{post_id}:")
+            for ts, likes, comments in series:
+                print(f"  {datetime.fromtimestamp(ts).isoformat()}  likes={likes:,}  comments={comments:,}")
+            growth = store.growth(post_id, window)
+            if growth:
+                print(f"  growth over {growth['hours']:.1f}h: {growth['likes_per_hour']:.1f} likes/h, "
+                      f"{growth['comments_per_hour']:.1f} comments/h")
+        
+        if top_n:
+            for row in store.top_growth(top_n):
+                print(f"{row['post_id']}  {row['likes_per_hour']:.1f} likes/h  {row['comments_per_hour']:.1f} comments/h  "
+                      f"({row['observations']} observations, {row['last_likes']:,} likes)")
+        store.close()
+    except Exception as e:
+        logger.error(f"❌ Engagement query failed: {e}")
+        sys.exit(1)
+
+
+@cli.command()
+@click.option('--output', '-o', default='output', help='Directory containing scraped JSON files')
+@click.option('--before', default=None, help='Only compact runs scraped before this date (YYYY-MM-DD)')
+@click.option('--keep-originals', is_flag=True, help='Keep the per-run files after compaction')
+@click.option('--list', 'list_segments', is_flag=True, help='List segments from the manifest instead of compacting')
+@click.option('--hashtag', '-h', default=None, help='With --list: only segments of this hashtag')
+@click.option('--since', default=None, help='With --list: only segments with posts taken on/after this date')
+@click.option('--until', default=None, help='With --list: only segments with posts taken before this date')
+def compact(output, before, keep_originals, list_segments, hashtag, since, until):
+    """Merge per-run output files into date/hashtag segments with a manifest."""
+    try:
+        if list_segments:
+            from src.output_index import select_segments
+            for path in select_segments(output, hashtag=hashtag, since=since, until=until):
+                print(path)
+            return
+        
+        from src.compaction import compact as compact_output
+        stats = compact_output(output, before=before, keep_originals=keep_originals)
+        logger.info(f"✅ Compaction completed: {stats['runs']} runs -> {stats['segments']} segments, "
+                    f"{stats['duplicates']} duplicate posts dropped")
+    except Exception as e:
+        logger.error(f"❌ Compaction failed: {e}")
+        sys.exit(1)
 
 
 @cli.command()
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .output_index import (
+    POST_SECTIONS,
+    LookupIndex,
+    index_path_for,
+    load_manifest,
+    manifest_path,
+    run_files,
+    write_indexed_json
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _partition_of(filepath: Path) -> Optional[Tuple[str, str]]:
+    """``(hashtag, YYYY-MM-DD)`` from a ``{hashtag}_{YYYYMMDD}_{HHMMSS}.json`` run file name."""
+    parts = filepath.stem.rsplit('_', 2)
+    if len(parts) != 3 or not (parts[1].isdigit() and len(parts[1]) == 8):
+        return None
+    hashtag, day, _ = parts
+    return hashtag, f"{day[:4]}-{day[4:6]}-{day[6:]}"
+
+
+def _keep_latest(posts: Dict[str, Any], post: Dict[str, Any]):
+    current = posts.get(post["post_id"])
+    if current is None or post["observed_at"] >= current["observed_at"]:
+        posts[post["post_id"]] = post
+
+
+def _merge(segment: Optional[Dict[str, Any]], runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge run payloads (oldest first) into a segment payload.
+
+    Posts are deduplicated per section by ``post_id``; the most recent
+    observation of a post wins and keeps the ``scraped_at`` of its run as
+    ``observed_at``, so engagement history can be rebuilt from segments. The
+    segment keeps the ``ScrapedHashtagData`` fields (latest
+    ``hashtag_info``/``scraped_at``) so existing readers can load it.
+    """
+    sections: Dict[str, Dict[str, Any]] = {section: {} for section in POST_SECTIONS}
+    sources: List[str] = []
+    digests: Dict[str, str] = {}
+    latest = segment
+
+    if segment:
+        for section in POST_SECTIONS:
+            for post in segment.get(section, []):
+                post.setdefault("observed_at", segment["scraped_at"])
+                _keep_latest(sections[section], post)
+        sources.extend(segment["segment"]["source_files"])
+        digests.update(segment["segment"].get("source_digests", {}))
+
+    for run in runs:
+        for section in POST_SECTIONS:
+            for post in run.get(section, []):
+                _keep_latest(sections[section], dict(post, observed_at=run["scraped_at"]))
+        # A re-extracted run with a known name replaces that source
+        if run["_source"] not in sources:
+            sources.append(run["_source"])
+        digests[run["_source"]] = run["_digest"]
+        if latest is None or run["scraped_at"] >= latest["scraped_at"]:
+            latest = run
+
+    posts = [post for section in POST_SECTIONS for post in sections[section].values()]
+    taken = [post["taken_at"] for post in posts if post.get("taken_at")]
+    scraped = sorted(
+        ([segment["segment"]["first_scraped_at"]] if segment else []) + [run["scraped_at"] for run in runs]
+    )
+
+    merged = {
+        "hashtag": latest["hashtag"],
+        "hashtag_info": latest["hashtag_info"],
+        "scraped_at": latest["scraped_at"],
+        "total_posts_scraped": len(posts),
+        "segment": {
+            "runs": len(sources),
+            "first_scraped_at": scraped[0],
+            "last_scraped_at": latest["scraped_at"],
+            "first_taken_at": min(taken) if taken else None,
+            "last_taken_at": max(taken) if taken else None,
+            "source_files": sources,
+            "source_digests": digests
+        }
+    }
+    for section in POST_SECTIONS:
+        merged[section] = list(sections[section].values())
+    return merged
+
+
+def _write_manifest(output_dir: str, entries: Dict[str, Dict[str, Any]]):
+    path = manifest_path(output_dir)
+    manifest = {
+        "updated_at": datetime.now().isoformat(),
+        "segments": sorted(entries.values(), key=lambda entry: entry["path"])
+    }
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def compact(output_dir: str = "output", before: Optional[str] = None, keep_originals: bool = False) -> Dict[str, int]:
+    """
+    Merge per-run output files into one segment per hashtag and scrape date.
+
+    Segments are written to ``output/segments/{hashtag}/{YYYY-MM-DD}.json`` with
+    a sidecar offset index, and ``output/segments/manifest.json`` records each
+    segment's path, run count, scrape and ``taken_at`` time ranges and post
+    count. Compacting again merges new runs into existing segments. Run files
+    are removed once the manifest is written unless ``keep_originals`` is set.
+
+    Args:
+        output_dir: Directory holding the run files
+        before: Only compact runs scraped before this date (YYYY-MM-DD)
+        keep_originals: Leave the run files in place
+
+    Returns:
+        Counts of runs compacted, segments written and duplicate posts dropped
+    """
+    partitions: Dict[Tuple[str, str], List[Path]] = defaultdict(list)
+    for filepath in run_files(output_dir):
+        partition = _partition_of(filepath)
+        if partition is None:
+            logger.debug(f"Not a run file, leaving in place: {filepath}")
+            continue
+        if before and partition[1] >= before:
+            continue
+        partitions[partition].append(filepath)
+
+    segments_dir = manifest_path(output_dir).parent
+    entries = {entry["path"]: entry for entry in load_manifest(output_dir)["segments"]}
+    stats = {"runs": 0, "segments": 0, "duplicates": 0}
+    compacted: List[Path] = []
+    lookup = LookupIndex(output_dir)
+
+    for (hashtag, day), filepaths in sorted(partitions.items()):
+        relative = f"{hashtag}/{day}.json"
+        segment_file = segments_dir / relative
+        segment = None
+        if relative in entries and segment_file.exists():
+            with open(segment_file, 'r', encoding='utf-8') as f:
+                segment = json.load(f)
+
+        # Runs kept with --keep-originals are already part of the segment, unless
+        # the file was rewritten since (e.g. replayed under the same name)
+        already_merged = segment["segment"].get("source_digests", {}) if segment else {}
+
+        runs = []
+        for filepath in sorted(filepaths, key=lambda p: p.stem[-15:]):
+            try:
+                raw = filepath.read_bytes()
+                digest = hashlib.sha256(raw).hexdigest()
+                if already_merged.get(filepath.name) == digest:
+                    compacted.append(filepath)
+                    continue
+                run = json.loads(raw)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable run file {filepath}: {e}")
+                continue
+            run["_source"] = filepath.name
+            run["_digest"] = digest
+            runs.append(run)
+        if not runs:
+            continue
+
+        merged = _merge(segment, runs)
+        before_dedup = sum(len(run.get(s, [])) for run in runs for s in POST_SECTIONS)
+        if segment:
+            before_dedup += segment["total_posts_scraped"]
+        stats["duplicates"] += before_dedup - merged["total_posts_scraped"]
+
+        segment_file.parent.mkdir(parents=True, exist_ok=True)
+        write_indexed_json(merged, segment_file, atomic=True, lookup=lookup)
+
+        info = merged["segment"]
+        entries[relative] = {
+            "path": relative,
+            "hashtag": merged["hashtag"],
+            "date": day,
+            "runs": info["runs"],
+            "posts": merged["total_posts_scraped"],
+            "first_scraped_at": info["first_scraped_at"],
+            "last_scraped_at": info["last_scraped_at"],
+            "first_taken_at": info["first_taken_at"],
+            "last_taken_at": info["last_taken_at"],
+            "bytes": segment_file.stat().st_size
+        }
+        stats["runs"] += len(runs)
+        stats["segments"] += 1
+        compacted.extend(Path(output_dir) / run["_source"] for run in runs)
+
+    if stats["segments"]:
+        _write_manifest(output_dir, entries)
+
+    if not keep_originals:
+        for filepath in compacted:
+            filepath.unlink(missing_ok=True)
+            index_path_for(filepath).unlink(missing_ok=True)
+        lookup.remove_files(compacted)
+    lookup.close()
+
+    logger.info(
+        f"Compacted {stats['runs']} runs into {stats['segments']} segments "
+        f"({stats['duplicates']} duplicate posts dropped)"
+    )
+    return stats
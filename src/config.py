@@ -23,9 +23,25 @@ class Config:
     MAX_DELAY = float(os.getenv("MAX_DELAY", "3.0"))
     MAX_POSTS_PER_HASHTAG = int(os.getenv("MAX_POSTS_PER_HASHTAG", "100"))
     
+    SCHEDULER_DB = Path(os.getenv("SCHEDULER_DB", str(BASE_DIR / "scheduler.db")))
+    MAX_REQUESTS_PER_HOUR = int(os.getenv("MAX_REQUESTS_PER_HOUR", "200"))
+    
+    USER_CACHE_DB = Path(os.getenv("USER_CACHE_DB", str(BASE_DIR / "user_cache.db")))
+    USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", str(7 * 24 * 3600)))
+    
+    GEO_INDEX_DB = Path(os.getenv("GEO_INDEX_DB", str(BASE_DIR / "geo_index.db")))
+    SEARCH_INDEX_DB = Path(os.getenv("SEARCH_INDEX_DB", str(BASE_DIR / "search_index.db")))
+    ENGAGEMENT_DB = Path(os.getenv("ENGAGEMENT_DB", str(BASE_DIR / "engagement.db")))
+    
     REQUEST_TIMEOUT = 30
     MAX_RETRIES = 3
     RETRY_DELAY = 5
+    RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "120"))
+    
+    # Circuit breaker shared by all requests in a run
+    BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "3"))
+    BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "600"))
+    BREAKER_MODE = os.getenv("BREAKER_MODE", "pause")  # "pause" or "fail"
     
     @classmethod
     def get_proxy_url(cls) -> Optional[str]:
@@ -0,0 +1,245 @@
+import bisect
+import logging
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import config
+from .models import PostData, ScrapedHashtagData
+from .output_index import POST_SECTIONS
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS engagement (
+    post_id TEXT PRIMARY KEY,
+    observations INTEGER NOT NULL,
+    first_ts INTEGER NOT NULL,
+    first_likes INTEGER NOT NULL,
+    first_comments INTEGER NOT NULL,
+    last_ts INTEGER NOT NULL,
+    last_likes INTEGER NOT NULL,
+    last_comments INTEGER NOT NULL,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+Observation = Tuple[int, int, int]
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def encode_varints(values: Iterable[int], out: bytearray):
+    """Append zigzag LEB128 varints to ``out``."""
+    for value in values:
+        value = _zigzag(value)
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+
+def decode_varints(data: bytes) -> List[int]:
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(_unzigzag(value))
+            value = shift = 0
+    return values
+
+
+def encode_series(series: Iterable[Observation]) -> bytes:
+    """Delta-encode ``(timestamp, likes, comments)`` observations, oldest first."""
+    data = bytearray()
+    prev = (0, 0, 0)
+    for obs in series:
+        encode_varints((obs[0] - prev[0], obs[1] - prev[1], obs[2] - prev[2]), data)
+        prev = obs
+    return bytes(data)
+
+
+def decode_series(data: bytes) -> List[Observation]:
+    """Rebuild ``(timestamp, likes, comments)`` observations from their delta encoding."""
+    values = decode_varints(data)
+    series = []
+    ts = likes = comments = 0
+    for i in range(0, len(values), 3):
+        ts += values[i]
+        likes += values[i + 1]
+        comments += values[i + 2]
+        series.append((ts, likes, comments))
+    return series
+
+
+class EngagementStore:
+    """
+    Compact time series of like/comment counts per post.
+
+    Each post has one row: summary columns for its first and last observation
+    plus a blob of ``(Δtimestamp, Δlikes, Δcomments)`` triples as zigzag
+    varints. Appending only needs the last observation, so a new snapshot
+    typically costs 3-6 bytes instead of a full ``PostData`` copy.
+    Snapshots older than the last one (backfills) are inserted in time order by
+    re-encoding the post's series; a second snapshot at the same timestamp is
+    ignored.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path or config.ENGAGEMENT_DB)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def add_observations(self, observations: Iterable[Tuple[str, int, int, int]]) -> int:
+        """
+        Record ``(post_id, timestamp, likes, comments)`` observations.
+
+        Returns:
+            Number of observations stored
+        """
+        added = 0
+        with self.conn:
+            for post_id, ts, likes, comments in observations:
+                row = self.conn.execute(
+                    "SELECT last_ts, last_likes, last_comments, data FROM engagement WHERE post_id = ?",
+                    (post_id,)
+                ).fetchone()
+
+                if row is None:
+                    data = bytearray()
+                    encode_varints((ts, likes, comments), data)
+                    self.conn.execute(
+                        """
+                        INSERT INTO engagement VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        (post_id, ts, likes, comments, ts, likes, comments, bytes(data))
+                    )
+                elif ts > row["last_ts"]:
+                    data = bytearray(row["data"])
+                    encode_varints(
+                        (ts - row["last_ts"], likes - row["last_likes"], comments - row["last_comments"]), data
+                    )
+                    self.conn.execute(
+                        """
+                        UPDATE engagement SET observations = observations + 1,
+                            last_ts = ?, last_likes = ?, last_comments = ?, data = ?
+                        WHERE post_id = ?
+                        """,
+                        (ts, likes, comments, bytes(data), post_id)
+                    )
+                else:
+                    # Backfill: slot the snapshot into place and rewrite the series
+                    series = decode_series(row["data"])
+                    position = bisect.bisect_left(series, (ts,))
+                    if position < len(series) and series[position][0] == ts:
+                        continue
+                    series.insert(position, (ts, likes, comments))
+                    first = series[0]
+                    self.conn.execute(
+                        """
+                        UPDATE engagement SET observations = ?,
+                            first_ts = ?, first_likes = ?, first_comments = ?, data = ?
+                        WHERE post_id = ?
+                        """,
+                        (len(series), *first, encode_series(series), post_id)
+                    )
+                added += 1
+        return added
+
+    def add_posts(self, posts: Iterable[PostData], observed_at: datetime) -> int:
+        ts = int(observed_at.timestamp())
+        return self.add_observations(
+            (post.post_id, ts, post.like_count, post.comment_count) for post in posts
+        )
+
+    def add_scrape(self, data: ScrapedHashtagData, filepath: Optional[Path] = None) -> int:
+        added = self.add_posts(data.recent_posts + data.top_posts, data.scraped_at)
+        logger.debug(f"Recorded {added} engagement observations from #{data.hashtag}")
+        return added
+
+    def add_payload(self, payload: Dict[str, Any]) -> int:
+        """
+        Record observations from a saved scrape's raw JSON.
+
+        Compacted segments keep each post's ``observed_at`` (the scrape it was
+        last seen in); other files fall back to the payload's ``scraped_at``.
+        """
+        scraped_at = payload["scraped_at"]
+        return self.add_observations(
+            (
+                post["post_id"],
+                int(datetime.fromisoformat(post.get("observed_at") or scraped_at).timestamp()),
+                post.get("like_count") or 0,
+                post.get("comment_count") or 0
+            )
+            for section in POST_SECTIONS for post in payload.get(section, [])
+        )
+
+    def series(self, post_id: str) -> List[Observation]:
+        """Engagement curve of a post as ``(unix_timestamp, likes, comments)``, oldest first."""
+        row = self.conn.execute("SELECT data FROM engagement WHERE post_id = ?", (post_id,)).fetchone()
+        return decode_series(row["data"]) if row else []
+
+    def growth(self, post_id: str, window_hours: Optional[float] = None) -> Optional[Dict[str, float]]:
+        """
+        Likes and comments gained per hour.
+
+        Uses the first and last observation, or with ``window_hours`` the
+        observations within that many hours of the last one.
+        """
+        if window_hours is None:
+            row = self.conn.execute(
+                "SELECT first_ts, first_likes, first_comments, last_ts, last_likes, last_comments "
+                "FROM engagement WHERE post_id = ?",
+                (post_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            start = (row["first_ts"], row["first_likes"], row["first_comments"])
+            end = (row["last_ts"], row["last_likes"], row["last_comments"])
+        else:
+            series = self.series(post_id)
+            if not series:
+                return None
+            end = series[-1]
+            cutoff = end[0] - window_hours * 3600
+            start = next(obs for obs in series if obs[0] >= cutoff)
+
+        hours = (end[0] - start[0]) / 3600
+        if hours <= 0:
+            return None
+        return {
+            "hours": hours,
+            "likes_per_hour": (end[1] - start[1]) / hours,
+            "comments_per_hour": (end[2] - start[2]) / hours
+        }
+
+    def top_growth(self, limit: int = 20, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Posts with the highest overall likes/hour, from the summary columns only."""
+        sql = """
+            SELECT post_id, observations, first_ts, last_ts, last_likes, last_comments,
+                   (last_likes - first_likes) * 3600.0 / (last_ts - first_ts) AS likes_per_hour,
+                   (last_comments - first_comments) * 3600.0 / (last_ts - first_ts) AS comments_per_hour
+            FROM engagement WHERE last_ts > first_ts
+        """
+        params: List[Any] = []
+        if since:
+            sql += " AND last_ts >= ?"
+            params.append(int(since.timestamp()))
+        sql += " ORDER BY likes_per_hour DESC LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def close(self):
+        self.conn.close()
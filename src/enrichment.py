@@ -0,0 +1,136 @@
+import json
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .config import config
+from .instagram_client import InstagramClient
+from .models import PostData, ScrapedHashtagData
+from .profiling import span
+from .retry_policy import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# UserInfo fields filled from the user_info endpoint
+ENRICHED_FIELDS = ("full_name", "is_private", "follower_count", "following_count", "media_count", "biography")
+
+
+class UserCache:
+    """Persistent SQLite cache of user_info responses with a time-to-live."""
+
+    def __init__(self, db_path: Optional[Path] = None, ttl_seconds: Optional[int] = None):
+        self.db_path = Path(db_path or config.USER_CACHE_DB)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.USER_CACHE_TTL
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS users (pk TEXT PRIMARY KEY, data TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+
+    def get_many(self, pks: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Return the cached, unexpired entries among ``pks``."""
+        pks = list(pks)
+        cutoff = time.time() - self.ttl_seconds
+        found = {}
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(pks), 500):
+            batch = pks[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT pk, data FROM users WHERE fetched_at >= ? AND pk IN ({','.join('?' * len(batch))})",
+                (cutoff, *batch)
+            )
+            found.update((pk, json.loads(data)) for pk, data in rows)
+        return found
+
+    def put(self, pk: str, data: Dict[str, Any]):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO users (pk, data, fetched_at) VALUES (?, ?, ?)",
+                (pk, json.dumps(data, ensure_ascii=False), time.time())
+            )
+
+    def purge_expired(self) -> int:
+        with self.conn:
+            cursor = self.conn.execute("DELETE FROM users WHERE fetched_at < ?", (time.time() - self.ttl_seconds,))
+        return cursor.rowcount
+
+    def close(self):
+        self.conn.close()
+
+
+class UserEnricher:
+    """
+    Fills the profile fields of ``PostData.user`` with one lookup per unique author.
+
+    Authors are collected across everything passed to a single ``enrich`` call,
+    served from the ``UserCache`` where possible, and only the remaining unique
+    ``pk``s are fetched from Instagram.
+    """
+
+    def __init__(self, client: InstagramClient, cache: Optional[UserCache] = None):
+        self.client = client
+        self.cache = cache or UserCache()
+
+    def _fetch(self, pks: List[str]) -> Dict[str, Dict[str, Any]]:
+        fetched = {}
+        for pk in pks:
+            try:
+                info = self.client.get_user_info(pk)
+            except CircuitOpenError:
+                # Nothing more can be sent; let the caller defer the work
+                raise
+            except Exception as e:
+                logger.warning(f"Could not enrich user {pk}: {e}")
+                continue
+            if not info:
+                continue
+            data = {field: info.get(field) for field in ENRICHED_FIELDS}
+            self.cache.put(pk, data)
+            fetched[pk] = data
+        return fetched
+
+    def enrich_posts(self, posts: Iterable[PostData], max_fetch: Optional[int] = None) -> int:
+        """
+        Enrich ``posts`` in place.
+
+        Args:
+            posts: Posts whose authors should be filled in
+            max_fetch: Fetch at most this many users from Instagram; authors
+                beyond the limit are left as they are
+
+        Returns:
+            Number of users fetched from Instagram
+        """
+        posts = list(posts)
+        pks = list(dict.fromkeys(post.user.pk for post in posts))
+        if not pks:
+            return 0
+
+        with span("enrich"):
+            users = self.cache.get_many(pks)
+            missing = [pk for pk in pks if pk not in users]
+            logger.info(
+                f"Enriching {len(posts)} posts from {len(pks)} unique users "
+                f"({len(users)} cached, {len(missing)} to fetch)"
+            )
+            if max_fetch is not None and len(missing) > max_fetch:
+                logger.info(f"Request budget allows {max(max_fetch, 0)} lookups, skipping the rest")
+                missing = missing[:max(max_fetch, 0)]
+            fetched = self._fetch(missing)
+            users.update(fetched)
+
+            for post in posts:
+                data = users.get(post.user.pk)
+                if data:
+                    updates = {field: value for field, value in data.items() if value is not None}
+                    post.user = post.user.model_copy(update=updates)
+
+        return len(fetched)
+
+    def enrich(self, datasets: Iterable[ScrapedHashtagData], max_fetch: Optional[int] = None) -> int:
+        """Enrich every post of one or more scrapes as a single deduplicated batch."""
+        return self.enrich_posts(
+            (post for data in datasets for post in data.recent_posts + data.top_posts),
+            max_fetch=max_fetch
+        )
@@ -0,0 +1,127 @@
+import logging
+import math
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .config import config
+from .models import PostData, ScrapedHashtagData
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geo_posts (
+    id INTEGER PRIMARY KEY,
+    post_id TEXT UNIQUE NOT NULL,
+    shortcode TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lng REAL NOT NULL,
+    location_name TEXT,
+    city TEXT,
+    taken_at TEXT,
+    source TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS geo_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng);
+"""
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class GeoIndex:
+    """
+    R-tree index of post locations in SQLite.
+
+    Each located post gets one row in ``geo_posts`` and a zero-size box in the
+    ``geo_rtree`` virtual table, so bounding-box queries only touch matching
+    rows. Radius queries use the enclosing box and then filter by great-circle
+    distance. Boxes crossing the antimeridian are not supported.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path or config.GEO_INDEX_DB)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.row_factory = sqlite3.Row
+        try:
+            self.conn.executescript(SCHEMA)
+        except sqlite3.OperationalError as e:
+            raise RuntimeError(f"SQLite build lacks the rtree module required for the geo index: {e}")
+
+    def add_posts(self, posts: Iterable[PostData], source: Optional[str] = None) -> int:
+        """Index posts that have coordinates; already indexed posts are skipped."""
+        added = 0
+        with self.conn:
+            for post in posts:
+                location = post.location
+                if location is None or location.lat is None or location.lng is None:
+                    continue
+                cursor = self.conn.execute(
+                    """
+                    INSERT OR IGNORE INTO geo_posts (post_id, shortcode, lat, lng, location_name, city, taken_at, source)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (post.post_id, post.shortcode, location.lat, location.lng, location.name,
+                     location.city, post.taken_at.isoformat(), source)
+                )
+                if cursor.rowcount:
+                    self.conn.execute(
+                        "INSERT INTO geo_rtree VALUES (?, ?, ?, ?, ?)",
+                        (cursor.lastrowid, location.lat, location.lat, location.lng, location.lng)
+                    )
+                    added += 1
+        return added
+
+    def add_scrape(self, data: ScrapedHashtagData, filepath: Optional[Path] = None) -> int:
+        added = self.add_posts(data.recent_posts + data.top_posts, str(filepath) if filepath else None)
+        logger.debug(f"Geo-indexed {added} new posts from #{data.hashtag}")
+        return added
+
+    def bbox(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Posts whose location lies inside the box."""
+        # The rtree stores 32-bit floats, so it is used as an overlap prefilter
+        # and the exact coordinates decide
+        query = """
+            SELECT p.* FROM geo_rtree r JOIN geo_posts p ON p.id = r.id
+            WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lng >= ? AND r.min_lng <= ?
+              AND p.lat BETWEEN ? AND ? AND p.lng BETWEEN ? AND ?
+        """
+        params: List[Any] = [min_lat, max_lat, min_lng, max_lng, min_lat, max_lat, min_lng, max_lng]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def radius(self, lat: float, lng: float, radius_km: float, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Posts within ``radius_km`` of a point, nearest first, with ``distance_km`` added."""
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        cos_lat = math.cos(math.radians(lat))
+        dlng = 180.0 if cos_lat < 1e-6 else min(180.0, radius_km / (KM_PER_DEGREE_LAT * cos_lat))
+
+        results = []
+        for row in self.bbox(lat - dlat, lng - dlng, lat + dlat, lng + dlng):
+            distance = haversine_km(lat, lng, row["lat"], row["lng"])
+            if distance <= radius_km:
+                row["distance_km"] = round(distance, 3)
+                results.append(row)
+
+        results.sort(key=lambda row: row["distance_km"])
+        return results[:limit] if limit else results
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM geo_posts").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
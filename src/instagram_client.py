@@ -2,17 +2,13 @@ import logging
 import random
 import time
 from functools import wraps
-from typing import Any, Callable, Optional
+from typing import Callable, Optional
 
 from instagrapi import Client
-from instagrapi.exceptions import (
-    ClientError,
-    RateLimitError,
-    PleaseWaitFewMinutes,
-    ChallengeRequired
-)
 
 from .config import config
+from .recorder import HASHTAG_INFO, MEDIAS_RECENT, MEDIAS_TOP, ResponseRecorder
+from .retry_policy import RetryPolicy, retry_policy
 from .session_manager import SessionManager
 
 logger = logging.getLogger(__name__)
@@ -28,47 +24,34 @@ def rate_limit(func: Callable) -> Callable:
     return wrapper
 
 
-def retry_on_error(max_retries: int = None, delay: float = None):
+def retry_on_error(max_retries: int = None, delay: float = None, policy: Optional[RetryPolicy] = None):
+    """
+    Retry a client call according to a ``RetryPolicy``.
+
+    All decorated calls share the module-level ``retry_policy`` by default, so
+    its circuit breaker and error counters cover the whole run.
+    """
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args, **kwargs):
             retries = max_retries or config.MAX_RETRIES
             retry_delay = delay or config.RETRY_DELAY
-            
-            for attempt in range(retries):
-                try:
-                    return func(*args, **kwargs)
-                except (RateLimitError, PleaseWaitFewMinutes) as e:
-                    logger.warning(f"Rate limited on attempt {attempt + 1}: {e}")
-                    if attempt < retries - 1:
-                        wait_time = retry_delay * (2 ** attempt)
-                        logger.info(f"Waiting {wait_time}s before retry...")
-                        time.sleep(wait_time)
-                    else:
-                        raise
-                except ChallengeRequired as e:
-                    logger.error(f"Challenge required: {e}")
-                    raise
-                except ClientError as e:
-                    logger.error(f"Client error on attempt {attempt + 1}: {e}")
-                    if attempt < retries - 1:
-                        time.sleep(retry_delay)
-                    else:
-                        raise
-                except Exception as e:
-                    logger.error(f"Unexpected error on attempt {attempt + 1}: {e}")
-                    raise
-            
-            return None
+            return (policy or retry_policy).call(func, args, kwargs, retries, retry_delay)
         return wrapper
     return decorator
 
 
 class InstagramClient:
-    def __init__(self, session_manager: Optional[SessionManager] = None, warm_up: bool = True):
+    def __init__(
+        self,
+        session_manager: Optional[SessionManager] = None,
+        warm_up: bool = True,
+        recorder: Optional[ResponseRecorder] = None
+    ):
         self.session_manager = session_manager or SessionManager()
         self._client: Optional[Client] = None
         self.warm_up = warm_up
+        self.recorder = recorder
     
     @property
     def client(self) -> Client:
@@ -81,7 +64,10 @@ class InstagramClient:
     def get_hashtag_info(self, hashtag: str) -> dict:
         hashtag = hashtag.strip('#').lower()  # Instagram hashtags are case-insensitive
         logger.info(f"Fetching info for hashtag: #{hashtag}")
-        return self.client.hashtag_info(hashtag)
+        info = self.client.hashtag_info(hashtag)
+        if self.recorder:
+            self.recorder.record(HASHTAG_INFO, hashtag, info)
+        return info
     
     @rate_limit
     @retry_on_error()
@@ -91,7 +77,10 @@ class InstagramClient:
         logger.info(f"Fetching {amount} recent posts for #{hashtag}")
         
         # hashtag_medias_recent expects the hashtag name, not the ID
-        return self.client.hashtag_medias_recent(hashtag, amount)
+        medias = self.client.hashtag_medias_recent(hashtag, amount)
+        if self.recorder:
+            self.recorder.record(MEDIAS_RECENT, hashtag, medias)
+        return medias
     
     @rate_limit
     @retry_on_error()
@@ -101,7 +90,10 @@ class InstagramClient:
         logger.info(f"Fetching {amount} top posts for #{hashtag}")
         
         # hashtag_medias_top expects the hashtag name, not the ID
-        return self.client.hashtag_medias_top(hashtag, amount)
+        medias = self.client.hashtag_medias_top(hashtag, amount)
+        if self.recorder:
+            self.recorder.record(MEDIAS_TOP, hashtag, medias)
+        return medias
     
     @rate_limit
     @retry_on_error()
@@ -116,6 +108,8 @@ class InstagramClient:
         return self.client.user_info(user_id).dict()
     
     def close(self):
+        if self.recorder:
+            self.recorder.close()
         if self._client:
             logger.info("Closing Instagram client")
             self.session_manager.logout()
\ No newline at end of file
@@ -0,0 +1,422 @@
+import json
+import logging
+import mmap
+import os
+import sqlite3
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .models import PostData, ScrapedHashtagData
+from .profiling import span
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = ".idx.json"
+TMP_SUFFIX = ".tmp"
+POST_SECTIONS = ("recent_posts", "top_posts")
+
+# Combined key -> location map for a whole output directory
+LOOKUP_DB = "lookup.db"
+LOOKUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lookup (
+    key TEXT PRIMARY KEY,
+    file TEXT NOT NULL,
+    byte_offset INTEGER NOT NULL,
+    byte_length INTEGER NOT NULL,
+    observed_at TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS lookup_file ON lookup (file);
+"""
+
+# Compacted segments live under output/segments/, described by a manifest
+SEGMENTS_DIR = "segments"
+MANIFEST_NAME = "manifest.json"
+
+
+def index_path_for(filepath: Path) -> Path:
+    """Return the sidecar index path for an output file."""
+    filepath = Path(filepath)
+    return filepath.with_name(filepath.stem + INDEX_SUFFIX)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, indent=2, ensure_ascii=False)
+
+
+def encode_indexed_json(payload: Dict[str, Any]) -> Tuple[bytes, List[list]]:
+    """
+    Serialize an output payload and record where every post lands.
+
+    The bytes are identical to ``json.dump(payload, f, indent=2, ensure_ascii=False)``;
+    each post object is written as a self-contained JSON fragment so it can later
+    be decoded on its own from ``(offset, length)``.
+
+    Returns:
+        The encoded document and a list of ``[post_id, shortcode, section, offset, length]``
+    """
+    chunks: List[bytes] = []
+    entries: List[list] = []
+    position = 0
+
+    def emit(text: str):
+        nonlocal position
+        data = text.encode('utf-8')
+        chunks.append(data)
+        position += len(data)
+
+    if not payload:
+        emit("{}")
+        return b"".join(chunks), entries
+
+    emit("{")
+    for i, (key, value) in enumerate(payload.items()):
+        emit(("," if i else "") + "\n  " + json.dumps(key, ensure_ascii=False) + ": ")
+
+        if key in POST_SECTIONS and isinstance(value, list) and value:
+            emit("[")
+            for j, post in enumerate(value):
+                emit(("," if j else "") + "\n    ")
+                offset = position
+                emit(_dumps(post).replace("\n", "\n    "))
+                entries.append([
+                    str(post.get("post_id", "")),
+                    str(post.get("shortcode", "")),
+                    key,
+                    offset,
+                    position - offset
+                ])
+            emit("\n  ]")
+        else:
+            emit(_dumps(value).replace("\n", "\n  "))
+    emit("\n}")
+
+    return b"".join(chunks), entries
+
+
+def write_index(filepath: Path, entries: List[list], scraped_at: Optional[str] = None, suffix: str = "") -> Path:
+    """
+    Write the sidecar index for ``filepath``; ``scraped_at`` lets lookups prefer newer files.
+
+    A ``suffix`` writes the index under a temporary name (it still refers to
+    ``filepath``) for the caller to move into place.
+    """
+    filepath = Path(filepath)
+    index_file = index_path_for(filepath)
+    index_file = index_file.with_name(index_file.name + suffix)
+    with open(index_file, 'w', encoding='utf-8') as f:
+        json.dump({"file": filepath.name, "scraped_at": scraped_at, "posts": entries}, f, separators=(',', ':'))
+    return index_file
+
+
+def _observed_times(payload: Dict[str, Any]) -> List[str]:
+    """When each indexed post was observed, in ``encode_indexed_json`` entry order."""
+    return [
+        post.get("observed_at") or payload.get("scraped_at") or ""
+        for key, value in payload.items() if key in POST_SECTIONS and isinstance(value, list)
+        for post in value
+    ]
+
+
+def write_indexed_json(
+    payload: Dict[str, Any],
+    filepath: Path,
+    atomic: bool = False,
+    lookup: Optional["LookupIndex"] = None
+) -> Path:
+    """
+    Write ``payload`` to ``filepath`` together with its sidecar index.
+
+    With ``atomic`` both are written to temporary files first and then renamed
+    over the originals, so readers never see a half-written file. With
+    ``lookup`` the posts are also added to the directory's combined index.
+    """
+    filepath = Path(filepath)
+    with span("serialize"):
+        data, entries = encode_indexed_json(payload)
+    suffix = TMP_SUFFIX if atomic else ""
+    with span("write"):
+        target = filepath.with_name(filepath.name + suffix)
+        with open(target, 'wb') as f:
+            f.write(data)
+        index_file = write_index(filepath, entries, payload.get("scraped_at"), suffix)
+        if atomic:
+            os.replace(target, filepath)
+            os.replace(index_file, index_path_for(filepath))
+        if lookup:
+            lookup.add_file(filepath, entries, _observed_times(payload))
+    logger.debug(f"Indexed {len(entries)} posts in {filepath}")
+    return filepath
+
+
+def build_index(filepath: Path) -> Optional[Path]:
+    """
+    Create a sidecar index for an existing output file.
+
+    Only files whose bytes match the indexed encoding (i.e. written by
+    ``save_to_json``) can be indexed; anything else is skipped.
+    """
+    filepath = Path(filepath)
+    raw = filepath.read_bytes()
+    try:
+        payload = json.loads(raw)
+    except ValueError as e:
+        logger.warning(f"Skipping {filepath}: not valid JSON ({e})")
+        return None
+
+    data, entries = encode_indexed_json(payload)
+    if data != raw:
+        logger.warning(f"Skipping {filepath}: layout differs from save_to_json output")
+        return None
+    return write_index(filepath, entries, payload.get("scraped_at"))
+
+
+def build_missing_indexes(output_dir: str = "output") -> int:
+    """
+    Index every output file in ``output_dir`` that has no sidecar yet, then
+    rebuild the combined lookup index from all sidecars.
+    """
+    count = 0
+    for filepath in sorted(run_files(output_dir)):
+        if index_path_for(filepath).exists():
+            continue
+        if build_index(filepath):
+            count += 1
+
+    lookup = LookupIndex(output_dir)
+    try:
+        lookup.rebuild()
+    finally:
+        lookup.close()
+    return count
+
+
+def manifest_path(output_dir: str = "output") -> Path:
+    return Path(output_dir) / SEGMENTS_DIR / MANIFEST_NAME
+
+
+def load_manifest(output_dir: str = "output") -> Dict[str, Any]:
+    """Load the segment manifest written by ``compact``; empty if nothing was compacted yet."""
+    path = manifest_path(output_dir)
+    if not path.exists():
+        return {"segments": []}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def select_segments(
+    output_dir: str = "output",
+    hashtag: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+) -> List[Path]:
+    """
+    Use the manifest to pick only the segments that can hold matching posts.
+
+    Args:
+        hashtag: Only segments of this hashtag
+        since: Only segments with posts taken at or after this ISO date/time
+        until: Only segments with posts taken before this ISO date/time
+
+    Returns:
+        Segment paths, oldest scrape first
+    """
+    segments_dir = manifest_path(output_dir).parent
+    selected = []
+    for entry in load_manifest(output_dir)["segments"]:
+        if hashtag and entry["hashtag"].lower() != hashtag.strip('#').lower():
+            continue
+        if since and entry["last_taken_at"] and entry["last_taken_at"] < since:
+            continue
+        if until and entry["first_taken_at"] and entry["first_taken_at"] >= until:
+            continue
+        selected.append(entry)
+    selected.sort(key=lambda entry: entry["last_scraped_at"])
+    return [segments_dir / entry["path"] for entry in selected]
+
+
+def run_files(output_dir: str = "output") -> List[Path]:
+    """Per-run output files (not yet compacted) in ``output_dir``."""
+    return [p for p in Path(output_dir).glob("*.json") if not p.name.endswith(INDEX_SUFFIX)]
+
+
+def iter_payloads(output_dir: str = "output", by_time: bool = False) -> Iterator[Tuple[Path, Dict[str, Any]]]:
+    """
+    Yield the raw JSON of every saved scrape in ``output_dir``, compacted segments included.
+
+    Segments come first (oldest first), then run files ordered by name, or with
+    ``by_time`` by the ``_YYYYMMDD_HHMMSS`` timestamp that ``save_to_json``
+    appends, i.e. oldest scrape first.
+    """
+    filepaths = run_files(output_dir)
+    filepaths.sort(key=(lambda p: (p.stem[-15:], p.name)) if by_time else None)
+    for filepath in select_segments(output_dir) + filepaths:
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                yield filepath, json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping {filepath}: {e}")
+
+
+def iter_scrapes(output_dir: str = "output", by_time: bool = False) -> Iterator[Tuple[Path, ScrapedHashtagData]]:
+    """Like :func:`iter_payloads`, but yields validated ``ScrapedHashtagData`` models."""
+    for filepath, payload in iter_payloads(output_dir, by_time):
+        try:
+            yield filepath, ScrapedHashtagData.model_validate(payload)
+        except ValueError as e:
+            logger.warning(f"Skipping {filepath}: {e}")
+
+
+def _iter_indexes(output_dir: Path) -> List[Tuple[Path, str, List[list]]]:
+    """Load every sidecar index as ``(data file, scraped_at, entries)``, oldest scrape first."""
+    index_files = list(output_dir.glob("*" + INDEX_SUFFIX))
+    index_files.extend(index_path_for(segment) for segment in select_segments(str(output_dir)))
+
+    indexes = []
+    for index_file in index_files:
+        try:
+            with open(index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable index {index_file}: {e}")
+            continue
+        filepath = index_file.parent / index["file"]
+        try:
+            mtime = filepath.stat().st_mtime
+        except OSError:
+            mtime = 0.0
+        # Indexes written before scraped_at was recorded fall back to the file's mtime
+        scraped_at = index.get("scraped_at") or datetime.fromtimestamp(mtime).isoformat()
+        # Replays keep the original scraped_at; their file name stamp (stepped
+        # past the original's) and mtime break the tie in favour of the newer file
+        indexes.append(((scraped_at, filepath.stem[-15:], mtime), filepath, scraped_at, index["posts"]))
+
+    indexes.sort(key=lambda item: item[0])
+    return [(filepath, scraped_at, posts) for _, filepath, scraped_at, posts in indexes]
+
+
+class LookupIndex:
+    """
+    Combined ``key -> (file, offset, length)`` map for one output directory.
+
+    Lives in ``{output_dir}/lookup.db`` next to the per-file sidecars, with one
+    row per post_id and per shortcode. A key points at the most recently
+    observed copy of its post; on equal observation times the file written
+    last wins, so replays and compaction replace older copies. It can always
+    be rebuilt from the sidecars.
+    """
+
+    def __init__(self, output_dir: str = "output"):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.output_dir / LOOKUP_DB
+        self.is_new = not self.db_path.exists()
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.executescript(LOOKUP_SCHEMA)
+
+    def _relative(self, filepath: Path) -> str:
+        return Path(os.path.relpath(filepath, self.output_dir)).as_posix()
+
+    def add_file(self, filepath: Path, entries: List[list], observed_at: List[str]):
+        """Point the keys of ``entries`` at ``filepath`` unless a newer copy is already indexed."""
+        file = self._relative(filepath)
+        rows = [
+            (key, file, offset, length, observed)
+            for (post_id, shortcode, _section, offset, length), observed in zip(entries, observed_at)
+            for key in (post_id, shortcode) if key
+        ]
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO lookup (key, file, byte_offset, byte_length, observed_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    file = excluded.file,
+                    byte_offset = excluded.byte_offset,
+                    byte_length = excluded.byte_length,
+                    observed_at = excluded.observed_at
+                WHERE excluded.observed_at >= lookup.observed_at
+                """,
+                rows
+            )
+
+    def remove_files(self, filepaths: Iterable[Path]):
+        """Forget keys that still point at deleted files."""
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM lookup WHERE file = ?", [(self._relative(filepath),) for filepath in filepaths]
+            )
+
+    def rebuild(self) -> int:
+        """Recreate the map from every sidecar index; returns the number of keys."""
+        with self.conn:
+            self.conn.execute("DELETE FROM lookup")
+        for filepath, scraped_at, entries in _iter_indexes(self.output_dir):
+            self.add_file(filepath, entries, [scraped_at] * len(entries))
+        return self.conn.execute("SELECT COUNT(*) FROM lookup").fetchone()[0]
+
+    def get(self, keys: Iterable[str]) -> Dict[str, Tuple[Path, int, int]]:
+        keys = list(keys)
+        found = {}
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT key, file, byte_offset, byte_length FROM lookup WHERE key IN ({','.join('?' * len(batch))})",
+                batch
+            )
+            found.update((key, (self.output_dir / file, offset, length)) for key, file, offset, length in rows)
+        return found
+
+    def close(self):
+        self.conn.close()
+
+
+def lookup_raw(keys: Iterable[str], output_dir: str = "output") -> Dict[str, Dict[str, Any]]:
+    """
+    Resolve post ids or shortcodes to their stored JSON records.
+
+    Keys are resolved with one query against the combined ``LookupIndex``
+    (built from the sidecars on first use); each data file is then
+    memory-mapped once and just the matching byte ranges are decoded.
+
+    Args:
+        keys: post_ids and/or shortcodes to find
+        output_dir: Directory holding the output files and their indexes
+
+    Returns:
+        Mapping of each requested key that was found to its post record
+        (the copy from the most recent scrape wins when a post appears in several files)
+    """
+    wanted = set(keys)
+    if not wanted or not Path(output_dir).is_dir():
+        return {}
+
+    lookup = LookupIndex(output_dir)
+    try:
+        if lookup.is_new:
+            # Output written before the combined index existed
+            lookup.rebuild()
+        located = lookup.get(wanted)
+    finally:
+        lookup.close()
+
+    hits: Dict[Path, List[Tuple[str, int, int]]] = defaultdict(list)
+    for key, (filepath, offset, length) in located.items():
+        hits[filepath].append((key, offset, length))
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for filepath, records in hits.items():
+        try:
+            with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for key, offset, length in sorted(records, key=lambda r: r[1]):
+                    results[key] = json.loads(mm[offset:offset + length])
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read posts from {filepath} (try lookup --reindex): {e}")
+
+    return results
+
+
+def lookup_posts(keys: Iterable[str], output_dir: str = "output") -> Dict[str, PostData]:
+    """Like :func:`lookup_raw`, but returns validated ``PostData`` models."""
+    return {key: PostData.model_validate(record) for key, record in lookup_raw(keys, output_dir).items()}
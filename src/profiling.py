@@ -0,0 +1,129 @@
+import cProfile
+import io
+import logging
+import pstats
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_active: Optional["Profiler"] = None
+_disabled = nullcontext()
+
+
+def span(name: str):
+    """
+    Time a named phase of the pipeline when profiling is active.
+
+    With no active ``Profiler`` this returns a shared no-op context manager,
+    so instrumented code pays only a global lookup per call.
+    """
+    if _active is None:
+        return _disabled
+    return _active.span(name)
+
+
+class Profiler:
+    """Collects per-phase wall/CPU timings, a cProfile trace and optional tracemalloc snapshot."""
+
+    def __init__(self, trace_memory: bool = False, top_allocations: int = 25):
+        self.trace_memory = trace_memory
+        self.top_allocations = top_allocations
+        self.wall: Dict[str, float] = defaultdict(float)
+        self.cpu: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self._order: List[str] = []
+        self._profile = cProfile.Profile()
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._started_wall = 0.0
+        self._started_cpu = 0.0
+        self.total_wall = 0.0
+        self.total_cpu = 0.0
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        if name not in self.calls:
+            self._order.append(name)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.wall[name] += time.perf_counter() - wall
+            self.cpu[name] += time.process_time() - cpu
+            self.calls[name] += 1
+
+    def start(self):
+        global _active
+        if self.trace_memory:
+            tracemalloc.start()
+        self._started_wall, self._started_cpu = time.perf_counter(), time.process_time()
+        self._profile.enable()
+        _active = self
+
+    def stop(self):
+        global _active
+        _active = None
+        self._profile.disable()
+        self.total_wall = time.perf_counter() - self._started_wall
+        self.total_cpu = time.process_time() - self._started_cpu
+        if self.trace_memory:
+            self._snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def phase_table(self) -> str:
+        """Per-phase timings; nested phases are included in their parent's time."""
+        lines = [f"{'PHASE':<16} {'CALLS':>7} {'WALL s':>10} {'CPU s':>10} {'WALL %':>7}"]
+        for name in self._order:
+            share = self.wall[name] / self.total_wall * 100 if self.total_wall else 0.0
+            lines.append(
+                f"{name:<16} {self.calls[name]:>7} {self.wall[name]:>10.3f} {self.cpu[name]:>10.3f} {share:>6.1f}%"
+            )
+        lines.append(f"{'total':<16} {'':>7} {self.total_wall:>10.3f} {self.total_cpu:>10.3f} {100.0:>6.1f}%")
+        return "\n".join(lines)
+
+    def allocation_report(self) -> str:
+        if self._snapshot is None:
+            return ""
+        stats = self._snapshot.statistics('lineno')
+        lines = [f"Top {self.top_allocations} allocations by line:"]
+        lines.extend(str(stat) for stat in stats[:self.top_allocations])
+        return "\n".join(lines)
+
+    def save(self, output_dir: str, name: str) -> Path:
+        """
+        Write ``{name}.pstats`` and a ``{name}.txt`` summary to ``output_dir``.
+
+        The summary holds the phase table, the top functions by cumulative time
+        and, when enabled, the tracemalloc report.
+
+        Returns:
+            Path of the ``.pstats`` file
+        """
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+
+        stats_file = output_path / f"{name}.pstats"
+        self._profile.dump_stats(stats_file)
+
+        top_functions = io.StringIO()
+        pstats.Stats(self._profile, stream=top_functions).sort_stats('cumulative').print_stats(30)
+
+        sections = [self.phase_table(), top_functions.getvalue()]
+        if self.trace_memory:
+            sections.append(self.allocation_report())
+        with open(output_path / f"{name}.txt", 'w', encoding='utf-8') as f:
+            f.write("\n\n".join(sections) + "\n")
+
+        logger.info(f"Profile saved to: {stats_file}")
+        return stats_file
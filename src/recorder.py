@@ -0,0 +1,156 @@
+import gzip
+import json
+import logging
+from collections import defaultdict, deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
+
+from instagrapi.types import Hashtag, Media
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SUFFIX = ".jsonl.gz"
+
+HASHTAG_INFO = "hashtag_info"
+MEDIAS_RECENT = "medias_recent"
+MEDIAS_TOP = "medias_top"
+
+
+def _normalize(hashtag: str) -> str:
+    return hashtag.strip('#').lower()
+
+
+class ResponseRecorder:
+    """
+    Archives raw instagrapi responses to gzip-compressed JSON lines.
+
+    Each line holds one API call: ``{"call", "hashtag", "recorded_at", "result"}``
+    where ``result`` is the ``model_dump(mode='json')`` of the returned
+    ``Hashtag`` or list of ``Media`` objects.
+    """
+
+    def __init__(self, archive_dir: str = "archive"):
+        self.archive_dir = Path(archive_dir)
+        self.filepath: Optional[Path] = None
+        self._file = None
+
+    def _open(self):
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.filepath = self.archive_dir / f"raw_{timestamp}{ARCHIVE_SUFFIX}"
+        self._file = gzip.open(self.filepath, 'at', encoding='utf-8')
+        logger.info(f"Archiving raw responses to: {self.filepath}")
+
+    def record(self, call: str, hashtag: str, result: Any):
+        if self._file is None:
+            self._open()
+
+        if isinstance(result, list):
+            payload = [item.model_dump(mode='json') for item in result]
+        else:
+            payload = result.model_dump(mode='json')
+
+        line = {
+            "call": call,
+            "hashtag": _normalize(hashtag),
+            "recorded_at": datetime.now().isoformat(),
+            "result": payload
+        }
+        self._file.write(json.dumps(line, ensure_ascii=False, separators=(',', ':')) + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def iter_archive(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield the raw records stored in one archive file."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def find_archives(paths: Iterable[str]) -> List[Path]:
+    """Expand files and directories into a sorted list of archive files."""
+    archives = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            archives.extend(sorted(path.glob("*" + ARCHIVE_SUFFIX)))
+        else:
+            archives.append(path)
+    return archives
+
+
+def parse_result(call: str, result: Any) -> Any:
+    """Rebuild instagrapi objects from an archived ``result``."""
+    if call == HASHTAG_INFO:
+        return Hashtag.model_validate(result)
+    return [Media.model_validate(item) for item in result]
+
+
+def load_runs(archives: Iterable[Path]) -> List[Dict[str, Any]]:
+    """
+    Group archived calls into hashtag runs.
+
+    Each archived ``hashtag_info`` call starts a new run; the media calls that
+    follow it for the same hashtag belong to that run. A run is a dict with
+    ``hashtag``, ``recorded_at`` and one key per recorded call.
+    """
+    runs: List[Dict[str, Any]] = []
+    latest: Dict[str, Dict[str, Any]] = {}
+    for archive in archives:
+        for record in iter_archive(archive):
+            hashtag = record["hashtag"]
+            if record["call"] == HASHTAG_INFO or hashtag not in latest:
+                latest[hashtag] = {"hashtag": hashtag, "recorded_at": record["recorded_at"]}
+                runs.append(latest[hashtag])
+            latest[hashtag][record["call"]] = record["result"]
+    return runs
+
+
+class ReplayClient:
+    """
+    Drop-in stand-in for ``InstagramClient`` that serves archived responses.
+
+    Calling ``get_hashtag_info`` advances to the next run of that hashtag, so
+    runs recorded several times replay each one in turn. Media calls missing
+    from a run (because they failed while recording) replay as empty lists.
+    No network access or login happens.
+    """
+
+    def __init__(self, runs: Iterable[Dict[str, Any]]):
+        self.runs: List[Dict[str, Any]] = list(runs)
+        self._pending: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._current: Dict[str, Dict[str, Any]] = {}
+
+        for run in self.runs:
+            self._pending[run["hashtag"]].append(run)
+
+        logger.debug(f"Loaded {len(self.runs)} archived hashtag runs")
+
+    def _next(self, call: str, hashtag: str) -> Any:
+        hashtag = _normalize(hashtag)
+        if call == HASHTAG_INFO and self._pending[hashtag]:
+            self._current[hashtag] = self._pending[hashtag].popleft()
+
+        run = self._current.get(hashtag)
+        if run is None or (call == HASHTAG_INFO and call not in run):
+            raise LookupError(f"No archived {call} response for #{hashtag}")
+        # A run whose media call failed while recording replays as empty
+        return parse_result(call, run.get(call, []))
+
+    def get_hashtag_info(self, hashtag: str) -> Hashtag:
+        return self._next(HASHTAG_INFO, hashtag)
+
+    def get_hashtag_medias_recent(self, hashtag: str, amount: int = 27) -> List[Media]:
+        return self._next(MEDIAS_RECENT, hashtag)[:amount]
+
+    def get_hashtag_medias_top(self, hashtag: str, amount: int = 9) -> List[Media]:
+        return self._next(MEDIAS_TOP, hashtag)[:amount]
+
+    def close(self):
+        pass
@@ -0,0 +1,109 @@
+import logging
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .recorder import MEDIAS_RECENT, MEDIAS_TOP, ReplayClient, load_runs
+from .scraper import HashtagScraper
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker():
+    # Per-post debug logging dominates CPU time when re-extracting in bulk
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def _process_chunk(chunk_index: int, archives: List[Path], shard_dir: Path) -> Tuple[Path, int, int]:
+    """Re-extract every run in ``archives`` into one JSON-lines shard."""
+    runs = load_runs(archives)
+    scraper = HashtagScraper(client=ReplayClient(runs), human_delays=False)
+    shard = shard_dir / f"shard_{chunk_index:05d}.jsonl"
+    posts = 0
+
+    with open(shard, 'w', encoding='utf-8') as f:
+        for run in runs:
+            data = scraper.scrape_hashtag(
+                hashtag=run["hashtag"],
+                max_recent=len(run.get(MEDIAS_RECENT, [])),
+                max_top=len(run.get(MEDIAS_TOP, [])),
+                include_top_posts=MEDIAS_TOP in run
+            )
+            data.scraped_at = datetime.fromisoformat(run["recorded_at"])
+            f.write(data.model_dump_json() + "\n")
+            posts += data.total_posts_scraped
+
+    return shard, len(runs), posts
+
+
+def chunk_archives(archives: List[Path], workers: int, chunks_per_worker: int = 4) -> List[List[Path]]:
+    """Split archive files into contiguous chunks, a few per worker for load balancing."""
+    if not archives:
+        return []
+    size = max(1, -(-len(archives) // (workers * chunks_per_worker)))
+    return [archives[i:i + size] for i in range(0, len(archives), size)]
+
+
+def reprocess_archives(
+    archives: List[Path],
+    output_dir: str = "output",
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None
+) -> Path:
+    """
+    Re-extract archived raw responses across a process pool.
+
+    Workers receive chunks of archive paths, parse and extract them locally and
+    each write their own shard, so only file names and counts cross process
+    boundaries. Shards are then merged in input order into one JSON-lines file
+    holding a ``ScrapedHashtagData`` per line.
+
+    Args:
+        archives: Archive files produced by ``ResponseRecorder``
+        output_dir: Directory for the merged output
+        workers: Number of worker processes (default: CPU count)
+        chunk_size: Archive files per chunk (default: a few chunks per worker)
+
+    Returns:
+        Path of the merged output file
+    """
+    workers = workers or os.cpu_count() or 1
+    if chunk_size:
+        chunks = [archives[i:i + chunk_size] for i in range(0, len(archives), chunk_size)]
+    else:
+        chunks = chunk_archives(archives, workers)
+
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    shard_dir = output_path / f".reprocess_{timestamp}"
+    shard_dir.mkdir()
+
+    merged = output_path / f"reprocessed_{timestamp}.jsonl"
+    logger.info(f"Reprocessing {len(archives)} archives in {len(chunks)} chunks on {workers} workers")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [
+                pool.submit(_process_chunk, i, chunk, shard_dir)
+                for i, chunk in enumerate(chunks)
+            ]
+            results = [future.result() for future in futures]
+
+        with open(merged, 'wb') as out:
+            for shard, _, _ in results:
+                with open(shard, 'rb') as f:
+                    shutil.copyfileobj(f, out)
+    except BaseException:
+        merged.unlink(missing_ok=True)
+        raise
+    finally:
+        # Never leave shard directories behind, even when a worker fails
+        shutil.rmtree(shard_dir, ignore_errors=True)
+
+    total_runs = sum(runs for _, runs, _ in results)
+    total_posts = sum(posts for _, _, posts in results)
+    logger.info(f"Reprocessed {total_runs} runs ({total_posts} posts) into: {merged}")
+    return merged
@@ -0,0 +1,222 @@
+import logging
+import random
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from instagrapi.exceptions import (
+    ChallengeRequired,
+    ClientBadRequestError,
+    ClientConnectionError,
+    ClientError,
+    ClientForbiddenError,
+    ClientNotFoundError,
+    ClientRequestTimeout,
+    ClientThrottledError,
+    FeedbackRequired,
+    HashtagNotFound,
+    LoginRequired,
+    MediaNotFound,
+    PleaseWaitFewMinutes,
+    PrivateAccount,
+    RateLimitError,
+    SentryBlock,
+    UserNotFound
+)
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+# Error categories
+PERMANENT = "permanent"    # will never succeed on retry (missing/private objects, bad requests)
+RATE_LIMIT = "rate_limit"  # Instagram wants us to slow down; trips the circuit breaker
+BLOCKED = "blocked"        # account/action blocked; opens the breaker immediately
+TRANSIENT = "transient"    # network hiccups and unknown client errors; retried with backoff
+
+# Checked in order, so subclasses must come before their bases
+ERROR_CATEGORIES: Tuple[Tuple[type, str], ...] = (
+    (SentryBlock, BLOCKED),
+    (FeedbackRequired, BLOCKED),
+    (PleaseWaitFewMinutes, RATE_LIMIT),
+    (RateLimitError, RATE_LIMIT),
+    (ClientThrottledError, RATE_LIMIT),
+    (ChallengeRequired, PERMANENT),
+    (LoginRequired, PERMANENT),
+    (HashtagNotFound, PERMANENT),
+    (MediaNotFound, PERMANENT),
+    (UserNotFound, PERMANENT),
+    (PrivateAccount, PERMANENT),
+    (ClientNotFoundError, PERMANENT),
+    (ClientForbiddenError, PERMANENT),
+    (ClientBadRequestError, PERMANENT),
+    (ClientConnectionError, TRANSIENT),
+    (ClientRequestTimeout, TRANSIENT),
+    (ClientError, TRANSIENT),
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Instagram while the circuit breaker is open (fail-fast mode)."""
+
+
+def classify(error: BaseException) -> Optional[str]:
+    """Return the category of an error, or None for errors that are not Instagram client errors."""
+    for error_type, category in ERROR_CATEGORIES:
+        if isinstance(error, error_type):
+            return category
+    return None
+
+
+class CircuitBreaker:
+    """
+    Run-wide breaker for rate limiting and blocks.
+
+    After ``threshold`` consecutive rate-limit errors (or a single block) the
+    breaker opens for ``cooldown`` seconds. While open, calls either wait for
+    the cooldown to end (``pause``) or raise ``CircuitOpenError`` (``fail``).
+    Once the cooldown has passed one trial call is let through: success closes
+    the breaker, failure re-opens it with the cooldown doubled (up to
+    ``max_cooldown``).
+    """
+
+    def __init__(
+        self,
+        threshold: int = 3,
+        cooldown: float = 600.0,
+        max_cooldown: float = 3600.0,
+        mode: str = "pause"
+    ):
+        if mode not in ("pause", "fail"):
+            raise ValueError(f"Unknown circuit breaker mode: {mode}")
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.mode = mode
+        self.failures = 0
+        self.cooldown = cooldown
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.time() >= self.opened_at + self.cooldown else "open"
+
+    @property
+    def remaining(self) -> float:
+        """Seconds left in the current cooldown (0 when not open)."""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - time.time())
+
+    def before_call(self):
+        remaining = self.remaining
+        if remaining <= 0:
+            return
+        if self.mode == "fail":
+            raise CircuitOpenError(f"Circuit breaker open for another {remaining:.0f}s")
+        logger.warning(f"Circuit breaker open, pausing {remaining:.0f}s before next request")
+        time.sleep(remaining)
+
+    def record_success(self):
+        self.failures = 0
+        if self.opened_at is not None:
+            logger.info("Circuit breaker closed")
+            self.opened_at = None
+            self.cooldown = self.base_cooldown
+
+    def record_failure(self, category: str):
+        self.failures += 1
+        half_open = self.opened_at is not None
+        if half_open or category == BLOCKED or self.failures >= self.threshold:
+            if half_open:
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self.opened_at = time.time()
+            self.times_opened += 1
+            logger.error(f"Circuit breaker opened for {self.cooldown:.0f}s after {category} error")
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == "open"
+
+
+class RetryPolicy:
+    """
+    Shared retry behaviour for every decorated ``InstagramClient`` call.
+
+    Errors are classified (see ``ERROR_CATEGORIES``): permanent errors are raised
+    at once, rate limits and transient errors are retried with full-jitter
+    exponential backoff, and rate limits/blocks feed the run-wide
+    ``CircuitBreaker``. Counters per exception class are kept for reporting.
+    """
+
+    def __init__(self, breaker: Optional[CircuitBreaker] = None, max_delay: Optional[float] = None):
+        self.breaker = breaker or CircuitBreaker(
+            threshold=config.BREAKER_THRESHOLD,
+            cooldown=config.BREAKER_COOLDOWN,
+            mode=config.BREAKER_MODE
+        )
+        self.max_delay = max_delay if max_delay is not None else config.RETRY_MAX_DELAY
+        self.errors: Counter = Counter()
+        self.retries: Counter = Counter()
+        # Requests actually sent to Instagram
+        self.calls = 0
+
+    def backoff(self, base_delay: float, attempt: int) -> float:
+        """Full-jitter exponential backoff: uniform in [0, min(max_delay, base * 2**attempt)]."""
+        return random.uniform(0, min(self.max_delay, base_delay * (2 ** attempt)))
+
+    def call(self, func: Callable, args: tuple, kwargs: dict, retries: int, base_delay: float) -> Any:
+        retrying = None
+        for attempt in range(retries):
+            self.breaker.before_call()
+            # Only count a retry once it is actually sent (before_call may raise)
+            if retrying:
+                self.retries[retrying] += 1
+            self.calls += 1
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                category = classify(e)
+                if category is None:
+                    logger.error(f"Unexpected error on attempt {attempt + 1}: {e}")
+                    raise
+
+                self.errors[type(e).__name__] += 1
+                if category == PERMANENT:
+                    logger.error(f"Non-retryable {type(e).__name__}: {e}")
+                    raise
+
+                if category in (RATE_LIMIT, BLOCKED):
+                    logger.warning(f"Rate limited on attempt {attempt + 1}: {e}")
+                    self.breaker.record_failure(category)
+                else:
+                    logger.warning(f"Client error on attempt {attempt + 1}: {e}")
+
+                if attempt == retries - 1 or category == BLOCKED:
+                    raise
+                retrying = type(e).__name__
+
+                # An open breaker already enforces the wait in before_call()
+                if not self.breaker.is_open:
+                    wait_time = self.backoff(base_delay, attempt)
+                    logger.info(f"Waiting {wait_time:.1f}s before retry...")
+                    time.sleep(wait_time)
+            else:
+                self.breaker.record_success()
+                return result
+
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "errors": dict(self.errors),
+            "retries": dict(self.retries),
+            "breaker_state": self.breaker.state,
+            "breaker_opened": self.breaker.times_opened
+        }
+
+
+retry_policy = RetryPolicy()
@@ -0,0 +1,386 @@
+import logging
+import math
+import signal
+import sqlite3
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+from .config import config
+from .enrichment import UserEnricher
+from .instagram_client import InstagramClient
+from .models import ScrapedHashtagData
+from .retry_policy import CircuitOpenError, retry_policy
+from .scraper import HashtagScraper
+from .velocity import PAGE_SIZE, estimate_rate, plan_next_poll, rate_from_media_count, rate_from_taken_at
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    hashtag TEXT PRIMARY KEY,
+    interval_seconds INTEGER NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    max_recent INTEGER NOT NULL DEFAULT 50,
+    max_top INTEGER NOT NULL DEFAULT 9,
+    include_top INTEGER NOT NULL DEFAULT 1,
+    enabled INTEGER NOT NULL DEFAULT 1,
+    last_run TEXT,
+    next_run TEXT NOT NULL,
+    run_count INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    adaptive INTEGER NOT NULL DEFAULT 0,
+    posts_per_hour REAL,
+    last_media_count INTEGER,
+    last_media_count_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (enabled, next_run);
+"""
+
+# Columns added after the first release, applied to existing databases on open
+MIGRATIONS = {
+    "adaptive": "ALTER TABLE jobs ADD COLUMN adaptive INTEGER NOT NULL DEFAULT 0",
+    "posts_per_hour": "ALTER TABLE jobs ADD COLUMN posts_per_hour REAL",
+    "last_media_count": "ALTER TABLE jobs ADD COLUMN last_media_count INTEGER",
+    "last_media_count_at": "ALTER TABLE jobs ADD COLUMN last_media_count_at TEXT",
+}
+
+# Shortest interval a job may be scheduled with
+MIN_INTERVAL_SECONDS = 60
+
+UPDATABLE_COLUMNS = {
+    "interval_seconds", "max_recent", "posts_per_hour", "last_media_count", "last_media_count_at"
+}
+
+
+def job_cost(max_recent: int, max_top: int, include_top: bool) -> int:
+    """Requests a job is expected to send: hashtag info plus one per page of recent (and top) posts."""
+    cost = 1 + math.ceil(max_recent / PAGE_SIZE)
+    if include_top:
+        cost += math.ceil(max_top / PAGE_SIZE)
+    return cost
+
+
+def _format_rate(rate: Optional[float]) -> str:
+    return f"{rate:.1f}" if rate is not None else "n/a"
+
+
+class JobQueue:
+    """SQLite-backed queue of recurring hashtag scrape jobs."""
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path or config.SCHEDULER_DB)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        with self.conn:
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    self.conn.execute(statement)
+
+    def add_job(
+        self,
+        hashtag: str,
+        interval_seconds: int,
+        priority: int = 0,
+        max_recent: int = 50,
+        max_top: int = 9,
+        include_top: bool = True,
+        adaptive: bool = False
+    ):
+        """Add a job, or update its settings if the hashtag is already scheduled."""
+        if interval_seconds < MIN_INTERVAL_SECONDS:
+            raise ValueError(f"Interval must be at least {MIN_INTERVAL_SECONDS}s")
+        cost = job_cost(max_recent, max_top, include_top)
+        if cost > config.MAX_REQUESTS_PER_HOUR:
+            raise ValueError(
+                f"Job needs {cost} requests per run, more than MAX_REQUESTS_PER_HOUR ({config.MAX_REQUESTS_PER_HOUR})"
+            )
+        hashtag = hashtag.strip('#').lower()
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO jobs (hashtag, interval_seconds, priority, max_recent, max_top, include_top, adaptive, next_run)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (hashtag) DO UPDATE SET
+                    interval_seconds = excluded.interval_seconds,
+                    priority = excluded.priority,
+                    max_recent = excluded.max_recent,
+                    max_top = excluded.max_top,
+                    include_top = excluded.include_top,
+                    adaptive = excluded.adaptive,
+                    enabled = 1
+                """,
+                (hashtag, interval_seconds, priority, max_recent, max_top, int(include_top), int(adaptive),
+                 datetime.now().isoformat())
+            )
+
+    def remove_job(self, hashtag: str) -> bool:
+        with self.conn:
+            cursor = self.conn.execute("DELETE FROM jobs WHERE hashtag = ?", (hashtag.strip('#').lower(),))
+        return cursor.rowcount > 0
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        rows = self.conn.execute("SELECT * FROM jobs ORDER BY next_run")
+        return [dict(row) for row in rows]
+
+    def next_due(self, now: datetime) -> Optional[Dict[str, Any]]:
+        """Return the highest-priority job that is due, oldest first within a priority."""
+        row = self.conn.execute(
+            """
+            SELECT * FROM jobs WHERE enabled = 1 AND next_run <= ?
+            ORDER BY priority DESC, next_run ASC LIMIT 1
+            """,
+            (now.isoformat(),)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def next_wakeup(self) -> Optional[datetime]:
+        row = self.conn.execute("SELECT MIN(next_run) FROM jobs WHERE enabled = 1").fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    def mark_run(
+        self,
+        hashtag: str,
+        ran_at: datetime,
+        next_run: datetime,
+        error: Optional[str] = None,
+        **updates: Any
+    ):
+        """Record a finished run; ``updates`` may set any of ``UPDATABLE_COLUMNS``."""
+        unknown = set(updates) - UPDATABLE_COLUMNS
+        if unknown:
+            raise ValueError(f"Cannot update job columns: {', '.join(sorted(unknown))}")
+
+        assignments = "".join(f", {column} = ?" for column in updates)
+        with self.conn:
+            self.conn.execute(
+                f"""
+                UPDATE jobs SET last_run = ?, next_run = ?, run_count = run_count + 1, last_error = ?{assignments}
+                WHERE hashtag = ?
+                """,
+                (ran_at.isoformat(), next_run.isoformat(), error, *updates.values(), hashtag)
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+class RequestBudget:
+    """Sliding one-hour window limiting how many API requests the scheduler may issue."""
+
+    def __init__(self, max_per_hour: int):
+        self.max_per_hour = max_per_hour
+        self._sent: Deque[float] = deque()
+
+    def _expire(self, now: float):
+        while self._sent and now - self._sent[0] >= 3600:
+            self._sent.popleft()
+
+    def wait_time(self, cost: int) -> float:
+        """Seconds until ``cost`` more requests fit in the window."""
+        now = time.time()
+        self._expire(now)
+        overflow = len(self._sent) + cost - self.max_per_hour
+        if overflow <= 0:
+            return 0.0
+        if overflow > len(self._sent):
+            # Larger than the whole budget: the best we can do is an empty window
+            return max(0.0, self._sent[-1] + 3600 - now) if self._sent else 0.0
+        # Wait until enough of the oldest requests leave the window
+        oldest = self._sent[overflow - 1]
+        return max(0.0, oldest + 3600 - now)
+
+    def available(self) -> int:
+        """Requests that can still be issued in the current window."""
+        self._expire(time.time())
+        return max(0, self.max_per_hour - len(self._sent))
+
+    def spend(self, cost: int, at: Optional[float] = None):
+        self._sent.extend([at or time.time()] * cost)
+        if at is not None:
+            self._sent = deque(sorted(self._sent))
+
+    def refund(self, count: int):
+        """Give back the most recently spent requests that were never sent."""
+        for _ in range(min(count, len(self._sent))):
+            self._sent.pop()
+
+
+class Scheduler:
+    """
+    Long-running dispatcher for recurring hashtag jobs.
+
+    Keeps a single logged-in ``InstagramClient`` for the life of the process and
+    runs due jobs one at a time, highest priority first, within the hourly
+    request budget. All job state lives in the ``JobQueue`` database, so a
+    restarted scheduler picks up exactly where it stopped.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        client: Optional[InstagramClient] = None,
+        output_dir: str = "output",
+        max_requests_per_hour: Optional[int] = None,
+        poll_seconds: float = 30.0,
+        enricher: Optional[UserEnricher] = None,
+        stores: Optional[List[Any]] = None
+    ):
+        self.queue = queue
+        self.enricher = enricher
+        self.scraper = HashtagScraper(client=client or InstagramClient(), stores=stores)
+        self.output_dir = output_dir
+        self.budget = RequestBudget(max_requests_per_hour or config.MAX_REQUESTS_PER_HOUR)
+        self.poll_seconds = poll_seconds
+        self._running = False
+
+    def stop(self, *_):
+        logger.info("Scheduler stopping after current job...")
+        self._running = False
+
+    def _sleep(self, seconds: float):
+        # Sleep in short steps so a stop signal is honoured promptly
+        end = time.time() + seconds
+        while self._running and time.time() < end:
+            time.sleep(min(1.0, end - time.time()))
+
+    @staticmethod
+    def _cost(job: Dict[str, Any]) -> int:
+        return job_cost(job["max_recent"], job["max_top"], bool(job["include_top"]))
+
+    def _settle(self, charged: int, calls: int) -> int:
+        """Bring the budget charge for a job in line with the requests it actually sent."""
+        if calls > charged:
+            self.budget.spend(calls - charged)
+        elif calls < charged:
+            self.budget.refund(charged - calls)
+        return calls
+
+    def _velocity_updates(self, job: Dict[str, Any], data: ScrapedHashtagData) -> Dict[str, Any]:
+        """Measure posting velocity and, for adaptive jobs, resize the next poll."""
+        # When the previous media_count was read; last_run also moves on failed runs
+        previous_at = (
+            datetime.fromisoformat(job["last_media_count_at"]) if job["last_media_count_at"] else None
+        )
+        sample_rate = rate_from_taken_at(data.recent_posts)
+        count_rate = rate_from_media_count(
+            job["last_media_count"], previous_at, data.hashtag_info.media_count, data.scraped_at
+        )
+        rate = estimate_rate(sample_rate, count_rate, job["posts_per_hour"])
+
+        updates = {
+            "posts_per_hour": rate,
+            "last_media_count": data.hashtag_info.media_count,
+            "last_media_count_at": data.scraped_at.isoformat()
+        }
+        if job["adaptive"]:
+            interval, amount = plan_next_poll(rate, job["interval_seconds"], config.MAX_POSTS_PER_HASHTAG)
+            updates.update(interval_seconds=interval, max_recent=amount)
+
+        logger.info(
+            f"Metrics #{job['hashtag']}: posts/h "
+            f"sample={_format_rate(sample_rate)} count_delta={_format_rate(count_rate)} "
+            f"estimate={_format_rate(rate)}, "
+            f"next interval={updates.get('interval_seconds', job['interval_seconds'])}s "
+            f"amount={updates.get('max_recent', job['max_recent'])}"
+        )
+        return updates
+
+    def run_job(self, job: Dict[str, Any], cost: int = 0):
+        """Run one job; ``cost`` is what was charged to the budget for it."""
+        started = datetime.now()
+        calls_before = retry_policy.calls
+        charged = cost
+        error = None
+        updates: Dict[str, Any] = {}
+        try:
+            data = self.scraper.scrape_hashtag(
+                hashtag=job["hashtag"],
+                max_recent=job["max_recent"],
+                max_top=job["max_top"],
+                include_top_posts=bool(job["include_top"])
+            )
+            if self.enricher:
+                # Charge the scrape's retries first, then look up only as many
+                # authors as the hourly budget still allows
+                charged = self._settle(charged, retry_policy.calls - calls_before)
+                self.enricher.enrich([data], max_fetch=self.budget.available())
+            self.scraper.save_to_json(data, self.output_dir)
+            updates = self._velocity_updates(job, data)
+        except CircuitOpenError as e:
+            # Cut short by the breaker: leave the job due, charging only what was sent
+            self._settle(charged, retry_policy.calls - calls_before)
+            logger.warning(f"Job #{job['hashtag']} deferred: {e}")
+            return
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Job #{job['hashtag']} failed: {e}")
+
+        # Retries and lookups are charged as sent; unsent estimated requests are refunded
+        self._settle(charged, retry_policy.calls - calls_before)
+
+        if retry_policy.errors:
+            logger.info(f"Request errors so far: {retry_policy.stats()}")
+
+        interval = updates.get("interval_seconds", job["interval_seconds"])
+        next_run = started + timedelta(seconds=interval)
+        self.queue.mark_run(job["hashtag"], started, next_run, error, **updates)
+
+    def _wait_for_breaker(self) -> bool:
+        """Sleep out an open circuit breaker; returns True if it had to wait."""
+        remaining = retry_policy.breaker.remaining
+        if remaining <= 0:
+            return False
+        logger.warning(f"Circuit breaker open, holding jobs for {remaining:.0f}s")
+        self._sleep(remaining)
+        return True
+
+    def serve(self):
+        self._running = True
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        jobs = self.queue.list_jobs()
+        # Count runs from before a restart against the current window
+        for job in jobs:
+            if job["last_run"]:
+                self.budget.spend(self._cost(job), datetime.fromisoformat(job["last_run"]).timestamp())
+        logger.info(f"Scheduler started with {len(jobs)} jobs")
+
+        while self._running:
+            if self._wait_for_breaker():
+                continue
+
+            job = self.queue.next_due(datetime.now())
+            if job is None:
+                wakeup = self.queue.next_wakeup()
+                delay = self.poll_seconds
+                if wakeup:
+                    delay = min(delay, max(0.0, (wakeup - datetime.now()).total_seconds()))
+                self._sleep(delay)
+                continue
+
+            cost = self._cost(job)
+            if cost > self.budget.max_per_hour:
+                logger.warning(
+                    f"Job #{job['hashtag']} needs {cost} requests, more than the hourly budget of "
+                    f"{self.budget.max_per_hour}; it will run in an otherwise empty window"
+                )
+            wait = self.budget.wait_time(cost)
+            if wait > 0:
+                logger.info(f"Request budget exhausted, waiting {wait:.0f}s")
+                self._sleep(wait)
+                continue
+
+            logger.info(f"Running job #{job['hashtag']} (priority {job['priority']})")
+            self.budget.spend(cost)
+            self.run_job(job, cost)
+
+        self.queue.close()
+        logger.info("Scheduler stopped")
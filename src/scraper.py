@@ -1,9 +1,8 @@
-import json
 import logging
 import random
 import re
 import time
-from datetime import datetime
+from datetime import timedelta
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 
@@ -16,13 +15,23 @@ from .models import (
     HashtagInfo,
     ScrapedHashtagData
 )
+from .output_index import LookupIndex, write_indexed_json
+from .profiling import span
 
 logger = logging.getLogger(__name__)
 
 
 class HashtagScraper:
-    def __init__(self, client: Optional[InstagramClient] = None):
+    def __init__(
+        self,
+        client: Optional[InstagramClient] = None,
+        human_delays: bool = True,
+        stores: Optional[List[Any]] = None
+    ):
         self.client = client or InstagramClient()
+        self.human_delays = human_delays
+        # Indexes updated with every saved scrape; each has add_scrape(data, filepath)
+        self.stores = stores or []
     
     def scrape_hashtag(
         self,
@@ -61,7 +70,8 @@ class HashtagScraper:
             raise
     
     def _get_hashtag_info(self, hashtag: str) -> HashtagInfo:
-        info = self.client.get_hashtag_info(hashtag)
+        with span("hashtag_info"):
+            info = self.client.get_hashtag_info(hashtag)
         return HashtagInfo(
             id=str(info.id),
             name=info.name,
@@ -70,22 +80,26 @@ class HashtagScraper:
         )
     
     def _scrape_recent_posts(self, hashtag: str, max_posts: int) -> List[PostData]:
-        medias = self.client.get_hashtag_medias_recent(hashtag, max_posts)
+        with span("fetch"):
+            medias = self.client.get_hashtag_medias_recent(hashtag, max_posts)
         posts = []
         for i, media in enumerate(medias):
-            posts.append(self._extract_post_data(media))
+            with span("extract"):
+                posts.append(self._extract_post_data(media))
             # Add small random delay between processing posts to appear more human-like
-            if i < len(medias) - 1:
+            if self.human_delays and i < len(medias) - 1:
                 time.sleep(random.uniform(0.1, 0.3))
         return posts
     
     def _scrape_top_posts(self, hashtag: str, max_posts: int) -> List[PostData]:
-        medias = self.client.get_hashtag_medias_top(hashtag, max_posts)
+        with span("fetch"):
+            medias = self.client.get_hashtag_medias_top(hashtag, max_posts)
         posts = []
         for i, media in enumerate(medias):
-            posts.append(self._extract_post_data(media))
+            with span("extract"):
+                posts.append(self._extract_post_data(media))
             # Add small random delay between processing posts to appear more human-like
-            if i < len(medias) - 1:
+            if self.human_delays and i < len(medias) - 1:
                 time.sleep(random.uniform(0.1, 0.3))
         return posts
     
@@ -162,12 +176,30 @@ class HashtagScraper:
         output_path = Path(output_dir)
         output_path.mkdir(exist_ok=True)
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{data.hashtag}_{timestamp}.json"
-        filepath = output_path / filename
+        # Name the file after the scrape time (archived time for replays);
+        # step forward a second rather than overwrite an earlier run
+        scraped_at = data.scraped_at
+        filepath = output_path / f"{data.hashtag}_{scraped_at.strftime('%Y%m%d_%H%M%S')}.json"
+        while filepath.exists():
+            scraped_at += timedelta(seconds=1)
+            filepath = output_path / f"{data.hashtag}_{scraped_at.strftime('%Y%m%d_%H%M%S')}.json"
+        
+        # Also writes a sidecar index and updates the combined lookup index
+        # so single posts can be looked up by id
+        with span("serialize"):
+            payload = data.model_dump(mode='json')
+        lookup = LookupIndex(output_dir)
+        try:
+            write_indexed_json(payload, filepath, lookup=lookup)
+        finally:
+            lookup.close()
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data.model_dump(mode='json'), f, indent=2, ensure_ascii=False)
+        for store in self.stores:
+            try:
+                with span("index"):
+                    store.add_scrape(data, filepath)
+            except Exception as e:
+                logger.warning(f"Failed to update {type(store).__name__}: {e}")
         
         logger.info(f"Data saved to: {filepath}")
         return filepath
\ No newline at end of file
@@ -0,0 +1,204 @@
+import logging
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .config import config
+from .models import PostData, ScrapedHashtagData
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_posts (
+    id INTEGER PRIMARY KEY,
+    post_id TEXT UNIQUE NOT NULL,
+    shortcode TEXT NOT NULL,
+    username TEXT,
+    taken_at TEXT
+);
+CREATE INDEX IF NOT EXISTS search_posts_taken_at ON search_posts (taken_at);
+CREATE TABLE IF NOT EXISTS search_tags (
+    tag TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    PRIMARY KEY (tag, id)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+    caption, hashtags, username,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# bm25 column weights for caption, hashtags, username
+BM25_WEIGHTS = (1.0, 2.0, 1.5)
+FTS_COLUMNS = ("caption", "hashtags", "username")
+FTS_OPERATORS = {"AND", "OR", "NOT"}
+
+# Quoted phrases, parentheses and everything else up to whitespace
+QUERY_TOKEN = re.compile(r'"[^"]*"?|[()]|[^\s()"]+')
+
+
+def _fts_term(term: str) -> str:
+    """Quote a bareword unless FTS5 would read it as a plain token or prefix."""
+    if term.endswith('*') and len(term) > 1:
+        return _fts_term(term[:-1]) + '*'
+    if re.fullmatch(r'\w+', term):
+        return term
+    return '"' + term.replace('"', '""') + '"'
+
+
+def to_fts_query(query: str) -> str:
+    """
+    Turn an analyst-style query into FTS5 syntax.
+
+    ``#keto`` becomes ``hashtags:keto``, barewords with punctuation such as
+    ``low-carb`` are searched as phrases, and quoted phrases, ``AND``/``OR``/
+    ``NOT``, parentheses, ``prefix*`` and ``column:term`` filters pass through.
+    """
+    parts = []
+    for token in QUERY_TOKEN.findall(query):
+        if token.startswith('"'):
+            parts.append(token if len(token) > 1 and token.endswith('"') else token + '"')
+        elif token in ("(", ")") or token in FTS_OPERATORS:
+            parts.append(token)
+        elif token.startswith('#') and len(token) > 1:
+            parts.append("hashtags:" + _fts_term(token[1:].lower()))
+        elif token.partition(':')[0] in FTS_COLUMNS and token.partition(':')[2]:
+            column, _, term = token.partition(':')
+            parts.append(f"{column}:{_fts_term(term)}")
+        else:
+            parts.append(_fts_term(token))
+    return " ".join(parts)
+
+
+class SearchIndex:
+    """
+    SQLite FTS5 index over post captions, hashtags and usernames.
+
+    ``search_fts`` shares its rowid with ``search_posts``, which holds the
+    filterable metadata; ``search_tags`` maps lowercased hashtags (from the
+    caption plus the hashtag the post was scraped under) to posts.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path or config.SEARCH_INDEX_DB)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.row_factory = sqlite3.Row
+        try:
+            self.conn.executescript(SCHEMA)
+        except sqlite3.OperationalError as e:
+            raise RuntimeError(f"SQLite build lacks the fts5 module required for the search index: {e}")
+
+    def add_posts(self, posts: Iterable[PostData], scraped_hashtag: Optional[str] = None) -> int:
+        """
+        Index new posts and refresh posts seen before.
+
+        A post already in the index keeps its row; it gains any new hashtags
+        (including ``scraped_hashtag``) and its text is updated if the caption
+        or username changed.
+
+        Returns:
+            Number of posts that were not indexed yet
+        """
+        added = 0
+        with self.conn:
+            for post in posts:
+                tags = {tag.lower() for tag in post.hashtags}
+                if scraped_hashtag:
+                    tags.add(scraped_hashtag.strip('#').lower())
+                caption = post.caption_text or ""
+
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO search_posts (post_id, shortcode, username, taken_at) VALUES (?, ?, ?, ?)",
+                    (post.post_id, post.shortcode, post.user.username, post.taken_at.isoformat())
+                )
+                if cursor.rowcount:
+                    rowid = cursor.lastrowid
+                    self.conn.execute(
+                        "INSERT INTO search_fts (rowid, caption, hashtags, username) VALUES (?, ?, ?, ?)",
+                        (rowid, caption, " ".join(sorted(tags)), post.user.username)
+                    )
+                    added += 1
+                else:
+                    rowid = self.conn.execute(
+                        "SELECT id FROM search_posts WHERE post_id = ?", (post.post_id,)
+                    ).fetchone()["id"]
+                    row = self.conn.execute(
+                        "SELECT caption, hashtags, username FROM search_fts WHERE rowid = ?", (rowid,)
+                    ).fetchone()
+                    tags.update(row["hashtags"].split())
+                    text = (caption, " ".join(sorted(tags)), post.user.username)
+                    if text != (row["caption"], row["hashtags"], row["username"]):
+                        self.conn.execute(
+                            "UPDATE search_fts SET caption = ?, hashtags = ?, username = ? WHERE rowid = ?",
+                            (*text, rowid)
+                        )
+                        self.conn.execute(
+                            "UPDATE search_posts SET username = ? WHERE id = ?", (post.user.username, rowid)
+                        )
+
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO search_tags (tag, id) VALUES (?, ?)",
+                    [(tag, rowid) for tag in tags]
+                )
+        return added
+
+    def add_scrape(self, data: ScrapedHashtagData, filepath: Optional[Path] = None) -> int:
+        added = self.add_posts(data.recent_posts + data.top_posts, data.hashtag)
+        logger.debug(f"Search-indexed {added} new posts from #{data.hashtag}")
+        return added
+
+    def search(
+        self,
+        query: str,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        hashtag: Optional[str] = None,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        Run an FTS5 query and return matches ranked by BM25 (best first).
+
+        Args:
+            query: Search query, e.g. ``keto bread``, ``"low carb"``, ``low-carb``,
+                ``#keto``, ``recip*``, ``username:ketouser`` (see :func:`to_fts_query`)
+            since: Only posts taken at or after this ISO date/time
+            until: Only posts taken before this ISO date/time
+            hashtag: Only posts carrying this hashtag
+            limit: Maximum number of results
+        """
+        sql = f"""
+            SELECT p.post_id, p.shortcode, p.username, p.taken_at,
+                   snippet(search_fts, 0, '[', ']', '...', 16) AS snippet,
+                   bm25(search_fts, {', '.join(map(str, BM25_WEIGHTS))}) AS score
+            FROM search_fts JOIN search_posts p ON p.id = search_fts.rowid
+            WHERE search_fts MATCH ?
+        """
+        params: List[Any] = [to_fts_query(query)]
+        if since:
+            sql += " AND p.taken_at >= ?"
+            params.append(since)
+        if until:
+            sql += " AND p.taken_at < ?"
+            params.append(until)
+        if hashtag:
+            sql += " AND p.id IN (SELECT id FROM search_tags WHERE tag = ?)"
+            params.append(hashtag.strip('#').lower())
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+
+        try:
+            return [dict(row) for row in self.conn.execute(sql, params)]
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid query syntax {query!r}: {e}")
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM search_posts").fetchone()[0]
+
+    def optimize(self):
+        """Merge FTS5 segments after large incremental loads."""
+        with self.conn:
+            self.conn.execute("INSERT INTO search_fts (search_fts) VALUES ('optimize')")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,94 @@
+import math
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from .models import PostData
+
+# Posts returned per page by Instagram's recent-media feed
+PAGE_SIZE = 27
+
+MIN_INTERVAL_SECONDS = 300
+MAX_INTERVAL_SECONDS = 24 * 3600
+
+# Poll this much sooner than a full page of posts is expected
+HEADROOM = 1.2
+
+# Weight of the newest measurement when smoothing estimates across runs
+SMOOTHING = 0.5
+
+
+def rate_from_taken_at(posts: List[PostData]) -> Optional[float]:
+    """Estimate posts/hour from the spacing of ``taken_at`` in a batch of recent posts."""
+    if len(posts) < 2:
+        return None
+    times = sorted(post.taken_at for post in posts)
+    hours = (times[-1] - times[0]).total_seconds() / 3600
+    if hours <= 0:
+        return None
+    return (len(times) - 1) / hours
+
+
+def rate_from_media_count(
+    previous_count: Optional[int],
+    previous_at: Optional[datetime],
+    count: int,
+    at: datetime
+) -> Optional[float]:
+    """Estimate posts/hour from the growth of ``HashtagInfo.media_count`` between two runs."""
+    if previous_count is None or previous_at is None:
+        return None
+    hours = (at - previous_at).total_seconds() / 3600
+    # media_count can shrink when posts are deleted; that tells us nothing about velocity
+    if hours <= 0 or count < previous_count:
+        return None
+    return (count - previous_count) / hours
+
+
+def estimate_rate(
+    sample_rate: Optional[float],
+    count_rate: Optional[float],
+    previous_rate: Optional[float] = None
+) -> Optional[float]:
+    """
+    Combine the available measurements into one smoothed posts/hour estimate.
+
+    The media_count delta covers the whole interval between runs, so it is
+    preferred; the taken_at spacing of the latest batch is the fallback (and
+    the only option on a first run).
+    """
+    rate = count_rate if count_rate is not None else sample_rate
+    if rate is None:
+        return previous_rate
+    if previous_rate is None:
+        return rate
+    return SMOOTHING * rate + (1 - SMOOTHING) * previous_rate
+
+
+def plan_next_poll(
+    posts_per_hour: Optional[float],
+    current_interval: int,
+    max_amount: int,
+    page_size: int = PAGE_SIZE,
+    min_interval: int = MIN_INTERVAL_SECONDS,
+    max_interval: int = MAX_INTERVAL_SECONDS
+) -> Tuple[int, int]:
+    """
+    Size the next poll so it fetches roughly one page of new posts.
+
+    Returns:
+        ``(interval_seconds, amount)``. ``amount`` stays at one page unless the
+        interval is clamped at its minimum, in which case it grows to cover the
+        extra posts expected in that time.
+    """
+    if not posts_per_hour or posts_per_hour <= 0:
+        return min(max(current_interval * 2, min_interval), max_interval), page_size
+
+    # Poll a little before a full page accumulates so bursts between polls are not lost
+    interval = page_size / (posts_per_hour * HEADROOM) * 3600
+    interval = int(min(max(interval, min_interval), max_interval))
+
+    amount = min(page_size, max_amount)
+    if interval == min_interval:
+        expected = posts_per_hour * interval / 3600 * HEADROOM
+        amount = min(max(page_size, math.ceil(expected)), max_amount)
+    return interval, amount